@@ -2,16 +2,26 @@
 
 import os
 from dataclasses import dataclass
-from typing import Optional
+from typing import FrozenSet, Optional
 
 
-@dataclass
+# Regions recognized by the simplified region validation
+VALID_AWS_REGIONS: FrozenSet[str] = frozenset({
+    'us-east-1', 'us-east-2', 'us-west-1', 'us-west-2',
+    'ca-central-1', 'eu-west-1', 'eu-west-2', 'eu-west-3',
+    'eu-central-1', 'ap-southeast-1', 'ap-southeast-2',
+    'ap-northeast-1', 'ap-northeast-2', 'ap-south-1'
+})
+
+
+@dataclass(slots=True)
 class AppConfig:
     """Application configuration settings."""
     
     # AWS Configuration
     aws_profile: str = "bedrock-agent"
     aws_region: str = "ca-central-1"  # Default to Canada Central
+    verify_credentials: bool = False  # STS check when the agent starts
     bedrock_model_id: str = "anthropic.claude-3-haiku-20240307-v1:0"
     
     # UI Configuration
@@ -24,9 +34,15 @@ class AppConfig:
     top_p: float = 0.5
     max_tokens: int = 2000
     max_iterations: int = 5  # Increased from 2 to allow proper completion
+    max_tool_result_chars: int = 4000  # Per tool result in the response prompt
+    prompt_caching: bool = False  # Only for Bedrock models that support prompt caching
     
     # Session Configuration
-    memory_k: int = 5
+    memory_k: int = 5  # Past exchanges kept and replayed to the model
+    history_char_budget: int = 12000  # Max chars of replayed history
+    summarize_history: bool = False  # Summarize exchanges dropped from history with Bedrock
+    max_concurrent_requests: int = 4  # Agent requests in flight across all sessions
+    prewarm_mcp: bool = True  # Start MCP servers at app start when AWS_PROFILE is set
     
     # External APIs
     serpapi_api_key: Optional[str] = None
@@ -41,16 +57,17 @@ class AppConfig:
         self.bedrock_model_id = os.getenv("BEDROCK_MODEL_ID", self.bedrock_model_id)
         self.serpapi_api_key = os.getenv("SERPAPI_API_KEY", self.serpapi_api_key)
         self.log_level = os.getenv("LOG_LEVEL", self.log_level)
+        self.max_concurrent_requests = int(os.getenv("MAX_CONCURRENT_REQUESTS", self.max_concurrent_requests))
+        self.memory_k = int(os.getenv("MEMORY_K", self.memory_k))
+        self.history_char_budget = int(os.getenv("HISTORY_CHAR_BUDGET", self.history_char_budget))
+        self.summarize_history = os.getenv("SUMMARIZE_HISTORY", str(self.summarize_history)).lower() == "true"
+        self.max_tool_result_chars = int(os.getenv("MAX_TOOL_RESULT_CHARS", self.max_tool_result_chars))
+        self.prompt_caching = os.getenv("PROMPT_CACHING", str(self.prompt_caching)).lower() == "true"
+        self.prewarm_mcp = os.getenv("PREWARM_MCP", str(self.prewarm_mcp)).lower() == "true"
+        self.verify_credentials = os.getenv("VERIFY_CREDENTIALS", str(self.verify_credentials)).lower() == "true"
         
         # Validate region (simplified validation)
-        valid_regions = [
-            'us-east-1', 'us-east-2', 'us-west-1', 'us-west-2',
-            'ca-central-1', 'eu-west-1', 'eu-west-2', 'eu-west-3',
-            'eu-central-1', 'ap-southeast-1', 'ap-southeast-2',
-            'ap-northeast-1', 'ap-northeast-2', 'ap-south-1'
-        ]
-        
-        if self.aws_region not in valid_regions:
+        if self.aws_region not in VALID_AWS_REGIONS:
             print(f"Warning: '{self.aws_region}' may not be a recognized AWS region.")
         
         # Validate required configurations
@@ -13,7 +13,7 @@ except ImportError:
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class MCPServerConfig:
     """Configuration for a single MCP server."""
     
@@ -27,20 +27,26 @@ class MCPServerConfig:
     disabled: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class MCPConfig:
     """Configuration for official AWS Labs MCP servers with Python fallback."""
     
     servers: Dict[str, MCPServerConfig] = field(default_factory=dict)
+    _client_config_cache: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         """Initialize official AWS Labs MCP server configurations."""
+        self._client_config_cache = None
         self._setup_official_aws_labs_servers()
         self._setup_python_fallback_servers()
     
     def _setup_official_aws_labs_servers(self):
         """Setup official AWS Labs MCP server configurations."""
         
+        # Resolve shared environment settings once so every server uses the same defaults
+        aws_region = os.getenv("AWS_REGION", "ca-central-1")
+        aws_profile = os.getenv("AWS_PROFILE", "")
+        
         # Check if we should prioritize reliable servers
         prioritize_reliable = os.getenv("PRIORITIZE_RELIABLE_SERVERS", "true").lower() == "true"
         
@@ -50,8 +56,8 @@ class MCPConfig:
             command="uvx",
             args=["awslabs.aws-api-mcp-server@latest"],
             env={
-                "AWS_REGION": os.getenv("AWS_REGION", "ca-central-1"),
-                "AWS_API_MCP_PROFILE_NAME": os.getenv("AWS_PROFILE", ""),
+                "AWS_REGION": aws_region,
+                "AWS_API_MCP_PROFILE_NAME": aws_profile,
                 "AWS_API_MCP_WORKING_DIR": os.getenv("AWS_API_MCP_WORKING_DIR", "/tmp"),
             },
             timeout=30,  # Increased timeout for pre-installed servers
@@ -81,7 +87,7 @@ class MCPConfig:
             command="uvx",
             args=["awslabs.aws-documentation-mcp-server@latest"],
             env={
-                "AWS_REGION": os.getenv("AWS_REGION", "ca-central-1"),
+                "AWS_REGION": aws_region,
             },
             timeout=20,  # Increased timeout for pre-installed servers
             auto_approve=["*"],
@@ -95,7 +101,7 @@ class MCPConfig:
                 command="uvx",
                 args=["awslabs.aws-pricing-mcp-server@latest"],
                 env={
-                    "AWS_REGION": os.getenv("AWS_REGION", "ca-central-1"),
+                    "AWS_REGION": aws_region,
                 },
                 timeout=15,  # Shorter timeout to prevent hanging
                 auto_approve=["*"],
@@ -105,8 +111,11 @@ class MCPConfig:
     def _setup_python_fallback_servers(self):
         """Setup reliable Python-based fallback servers."""
         
+        # Resolve shared environment settings once so every server uses the same defaults
+        aws_region = os.getenv("AWS_REGION", "ca-central-1")
+        aws_profile = os.getenv("AWS_PROFILE", "")
+        
         # Get the absolute path to the project root directory
-        import os
         current_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(current_dir)
         src_dir = os.path.join(project_root, "src")
@@ -117,8 +126,8 @@ class MCPConfig:
             command="python",
             args=[os.path.join(src_dir, "mcp_servers", "aws_tools", "server.py")],
             env={
-                "AWS_REGION": os.getenv("AWS_REGION", "ca-central-1"),
-                "AWS_PROFILE": os.getenv("AWS_PROFILE", ""),
+                "AWS_REGION": aws_region,
+                "AWS_PROFILE": aws_profile,
                 "PYTHONPATH": src_dir,
             },
             working_dir=project_root,
@@ -152,15 +161,18 @@ class MCPConfig:
         """Enable fallback servers when official servers fail."""
         if "aws-tools-python" in self.servers:
             self.servers["aws-tools-python"].disabled = False
+            self._client_config_cache = None
     
     def add_server(self, server_config: MCPServerConfig):
         """Add a new MCP server configuration."""
         self.servers[server_config.name] = server_config
+        self._client_config_cache = None
     
     def remove_server(self, name: str):
         """Remove an MCP server configuration."""
         if name in self.servers:
             del self.servers[name]
+            self._client_config_cache = None
     
     def get_server(self, name: str) -> Optional[MCPServerConfig]:
         """Get MCP server configuration by name."""
@@ -175,10 +187,18 @@ class MCPConfig:
         }
     
     def to_mcp_client_config(self) -> Dict[str, Any]:
-        """Convert to MCP client configuration format."""
+        """Convert to MCP client configuration format (cached until servers change)."""
+        if self._client_config_cache is not None:
+            return self._client_config_cache
+            
         config = {"mcpServers": {}}
+        enabled = (
+            (name, server_config)
+            for name, server_config in self.servers.items()
+            if not server_config.disabled
+        )
         
-        for name, server_config in self.get_enabled_servers().items():
+        for name, server_config in enabled:
             config["mcpServers"][name] = {
                 "command": server_config.command,
                 "args": server_config.args,
@@ -191,6 +211,7 @@ class MCPConfig:
             if server_config.auto_approve:
                 config["mcpServers"][name]["autoApprove"] = server_config.auto_approve
         
+        self._client_config_cache = config
         return config
     
     @classmethod
@@ -13,15 +13,18 @@ def run_tests():
     print("🧪 AWS MCP Agent - Test Suite")
     print("=" * 40)
     
-    # Add src to path
+    # Add src and project root to path
     project_root = Path(__file__).parent
     src_path = project_root / 'src'
     sys.path.insert(0, str(src_path))
+    sys.path.insert(0, str(project_root))
+    
+    # Load the listed test modules directly instead of walking the tests directory
+    from tests._manifest import MODULES
     
-    # Discover and run tests
     loader = unittest.TestLoader()
-    start_dir = project_root / 'tests'
-    suite = loader.discover(str(start_dir), pattern='test_*.py')
+    loader.sortTestMethodsUsing = None
+    suite = loader.loadTestsFromNames(MODULES)
     
     # Run tests with detailed output
     runner = unittest.TextTestRunner(
@@ -31,7 +34,7 @@ def run_tests():
         failfast=False
     )
     
-    print(f"\n🔍 Discovering tests in: {start_dir}")
+    print(f"\n🔍 Loading test modules: {', '.join(MODULES)}")
     print(f"📁 Source path: {src_path}")
     print(f"🧪 Running test suite...\n")
     
@@ -1,10 +1,10 @@
-import asyncio
+import collections
 import logging
 import streamlit as st
 import sys
 import os
+import threading
 import time
-import boto3
 import json
 
 # Robust path setup for Streamlit
@@ -12,24 +12,31 @@ current_file = os.path.abspath(__file__)
 src_dir = os.path.dirname(current_file)
 project_root = os.path.dirname(src_dir)
 
-# Add both src directory and project root to Python path
-if src_dir not in sys.path:
-    sys.path.insert(0, src_dir)
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
+# Add both src directory and project root to Python path (once per process)
+if not getattr(sys, "_mcp_path_patched", False):
+    sys.path[:0] = [p for p in (project_root, src_dir) if p not in sys.path]
+    sys._mcp_path_patched = True
 
 from config.app_config import AppConfig
 from config.mcp_config import MCPConfig
-from core.isolated_mcp_client import IsolatedMCPClient
-from core.agent import SimpleAgent
-from core.async_handler import streamlit_async_handler
+from core.async_handler import AdmissionGate, streamlit_async_handler
 from core.logging_config import setup_enhanced_logging, log_separator
-from auth.aws_sso_auth import AWSSSOAuthenticator
+from auth.aws_sso_auth import get_authenticator
 
 # Configure enhanced logging
 setup_enhanced_logging(level="INFO")
 logger = logging.getLogger(__name__)
 
+# Debug history bounds: entries kept in session state, and entries rendered
+DEBUG_HISTORY_MAX = 50
+DEBUG_HISTORY_SHOWN = 10
+
+# Chat messages rendered as individual bubbles; older ones are folded into one block
+CHAT_HISTORY_LIVE = 20
+
+# Session keys that survive restart and logout
+PRESERVED_SESSION_KEYS = frozenset({"show_debug"})
+
 # Page config
 st.set_page_config(
     page_title="AWS MCP Agent",
@@ -38,41 +45,140 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+
+@st.cache_resource(show_spinner=False)
+def _get_boto_session(profile: str | None):
+    """Build one boto3 session per profile and reuse it across reruns and sessions."""
+    import boto3
+    return boto3.Session(profile_name=profile) if profile else boto3.Session()
+
+
+@st.cache_resource(show_spinner=False)
+def _app_cfg(profile: str | None, region: str | None) -> AppConfig:
+    """Parse the app config once per AWS profile/region pair."""
+    return AppConfig.from_env()
+
+
+@st.cache_resource(show_spinner=False)
+def _mcp_cfg(profile: str | None, region: str | None) -> MCPConfig:
+    """Parse the MCP server config once per AWS profile/region pair."""
+    return MCPConfig.from_env()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_mcp_client(profile: str | None, region: str | None):
+    """Share one MCP client, and its server subprocesses, across sessions per profile/region."""
+    from core.isolated_mcp_client import IsolatedMCPClient
+    return IsolatedMCPClient(_mcp_cfg(profile, region))
+
+
+@st.cache_resource(show_spinner=False)
+def _mcp_client_users():
+    """Lock and {(profile, region): session ids} tracking who still uses each shared MCP client."""
+    return threading.Lock(), {}
+
+
+def _session_id() -> str:
+    """Id of the Streamlit session running this script."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else ""
+
+
+def _acquire_mcp_client(profile: str | None, region: str | None):
+    """Get the shared MCP client for a profile/region and record this session as a user."""
+    lock, users = _mcp_client_users()
+    with lock:
+        users.setdefault((profile, region), set()).add(_session_id())
+        return _get_mcp_client(profile, region)
+
+
+def _release_mcp_client(key):
+    """Drop this session's claim on a shared MCP client; the last one out shuts it down."""
+    lock, users = _mcp_client_users()
+    with lock:
+        holders = users.get(key)
+        if holders is None:
+            return
+        holders.discard(_session_id())
+        if holders:
+            return
+        del users[key]
+        client = _get_mcp_client(*key)
+        # Evict under the lock so a session arriving now builds a fresh client
+        _get_mcp_client.clear(*key)
+        _prewarm_mcp_client.clear(*key)
+    logger.info(f"🧹 Shutting down MCP client for abandoned profile/region {key}")
+    # Stops the client's loop thread and its uvx server subprocesses
+    client.cleanup()
+
+
+@st.cache_resource(show_spinner=False)
+def _prewarm_mcp_client(profile: str | None, region: str | None):
+    """Start the shared MCP client's servers in the background, once per profile/region."""
+    client = _get_mcp_client(profile, region)
+    # initialize() holds the client's init lock, so the first session's own
+    # initialize call simply waits for this one instead of spawning again
+    threading.Thread(target=client.initialize, name="mcp-prewarm", daemon=True).start()
+    return client
+
+
+@st.cache_resource(show_spinner=False)
+def _get_admission_gate(_max_in_flight: int) -> AdmissionGate:
+    """One process-wide gate limiting concurrent agent requests."""
+    return AdmissionGate(_max_in_flight)
+
+
 class SimpleMCPApp:
     """Simplified MCP application focused on official AWS servers with SSO authentication."""
     
     def __init__(self):
-        self.app_config = AppConfig.from_env()
-        self.mcp_config = MCPConfig.from_env()
-        self.sso_authenticator = AWSSSOAuthenticator()
+        # Both configs read AWS_PROFILE/AWS_REGION, which SSO login sets at runtime
+        aws_env = (os.environ.get("AWS_PROFILE"), os.environ.get("AWS_REGION"))
+        self.app_config = _app_cfg(*aws_env)
+        self.mcp_config = _mcp_cfg(*aws_env)
+        self.sso_authenticator = get_authenticator()
+        self.admission = _get_admission_gate(self.app_config.max_concurrent_requests)
+        self.admission.resize(self.app_config.max_concurrent_requests)
         
         # Initialize session state
         if "messages" not in st.session_state:
             st.session_state.messages = []
         if "debug_info" not in st.session_state:
-            st.session_state.debug_info = []
+            st.session_state.debug_info = collections.deque(maxlen=DEBUG_HISTORY_MAX)
         if "show_debug" not in st.session_state:
             st.session_state.show_debug = False
         if "authenticated" not in st.session_state:
             st.session_state.authenticated = False
             
-    async def initialize_components(self):
+    def initialize_components(self):
         """Initialize MCP client and agent."""
         logger.info("🔄 Initializing application components...")
         
+        # Imported here so the login page renders without loading the agent stack
+        from core.agent import SimpleAgent
+        
+        key = (os.environ.get("AWS_PROFILE"), os.environ.get("AWS_REGION"))
+        previous_key = st.session_state.get("mcp_client_key")
+        if previous_key is not None and previous_key != key:
+            # Profile or region changed: the agent is bound to the old client
+            _release_mcp_client(previous_key)
+            for stale in ("mcp_client", "mcp_client_key", "agent"):
+                st.session_state.pop(stale, None)
+                
         if "mcp_client" not in st.session_state:
-            logger.info("🔧 Creating isolated MCP client...")
-            st.session_state.mcp_client = IsolatedMCPClient(self.mcp_config)
+            logger.info("🔧 Getting shared MCP client...")
+            st.session_state.mcp_client = _acquire_mcp_client(*key)
+            st.session_state.mcp_client_key = key
             
         if "agent" not in st.session_state:
             logger.info("🤖 Creating agent...")
             # Get AWS session using SSO profile
             current_profile = self.sso_authenticator.get_current_profile()
+            aws_session = _get_boto_session(current_profile)
             if current_profile:
-                aws_session = boto3.Session(profile_name=current_profile)
-                logger.info(f"✅ Created AWS session with SSO profile: {current_profile}")
+                logger.info(f"✅ Using AWS session with SSO profile: {current_profile}")
             else:
-                aws_session = boto3.Session()  # Fallback to default
                 logger.warning("⚠️ No SSO profile set, using default session")
                 
             st.session_state.agent = SimpleAgent(
@@ -84,7 +190,8 @@ class SimpleMCPApp:
         # Initialize if not already done
         if not getattr(st.session_state.agent, '_initialized', False):
             logger.info("🚀 Initializing agent and MCP client...")
-            await st.session_state.agent.initialize()
+            # Runs on the handler's long-lived loop, like the chat stream
+            streamlit_async_handler.run_async(st.session_state.agent.initialize(), timeout=120)
             logger.info("✅ Agent initialization completed")
             
     def render_sidebar(self):
@@ -94,8 +201,12 @@ class SimpleMCPApp:
             st.title("🤖 AWS MCP Agent")
             st.markdown("---")
             
-            # Debug Section (Top)
-            self.render_debug_section()
+            # Debug Section (Top), refreshed on its own every 2s when auto-refresh is on
+            auto_refresh = st.session_state.get("auto_refresh_debug", False)
+            st.fragment(
+                self.render_debug_section,
+                run_every="2s" if auto_refresh else None
+            )(auto_refresh)
             st.markdown("---")
             
             # Login Information
@@ -113,7 +224,7 @@ class SimpleMCPApp:
             # Controls (Bottom)
             self.render_controls()
             
-    def render_debug_section(self):
+    def render_debug_section(self, auto_refresh: bool = False):
         """Render debug information section with live data."""
         st.subheader("🔍 Debug Info")
         
@@ -129,37 +240,37 @@ class SimpleMCPApp:
             with st.expander("📊 Live System Info", expanded=True):
                 col1, col2 = st.columns(2)
                 
+                # Each panel is emitted as one text element instead of one per line
                 with col1:
-                    st.text("🔧 System Status:")
+                    system_lines = ["🔧 System Status:"]
                     if hasattr(st.session_state, 'mcp_client'):
-                        st.text("✅ MCP Client: Ready")
+                        system_lines.append("✅ MCP Client: Ready")
                     else:
-                        st.text("🟡 MCP Client: Initializing")
+                        system_lines.append("🟡 MCP Client: Initializing")
                         
                     if hasattr(st.session_state, 'agent'):
-                        st.text("✅ Agent: Ready")
+                        system_lines.append("✅ Agent: Ready")
                         if hasattr(st.session_state.agent, 'conversation_history'):
                             msg_count = len(st.session_state.agent.conversation_history)
-                            st.text(f"💬 History: {msg_count} messages")
+                            system_lines.append(f"💬 History: {msg_count} messages")
                     else:
-                        st.text("🟡 Agent: Initializing")
+                        system_lines.append("🟡 Agent: Initializing")
+                    st.text("\n".join(system_lines))
                 
                 with col2:
-                    st.text("📡 MCP Status:")
                     if hasattr(st.session_state, 'mcp_client') and st.session_state.mcp_client:
                         server_count = getattr(st.session_state.mcp_client, 'servers_count', 0)
-                        st.text(f"🖥️ Servers: {server_count}")
-                        
                         tools = getattr(st.session_state.mcp_client, 'tools', {})
-                        st.text(f"🛠️ Tools: {len(tools)}")
+                        st.text(f"📡 MCP Status:\n🖥️ Servers: {server_count}\n🛠️ Tools: {len(tools)}")
                     else:
-                        st.text("🖥️ Servers: 0")
-                        st.text("🛠️ Tools: 0")
+                        st.text("📡 MCP Status:\n🖥️ Servers: 0\n🛠️ Tools: 0")
                 
                 # Session state info
-                st.text("📋 Session State:")
-                st.text(f"💬 Messages: {len(st.session_state.messages)}")
-                st.text(f"🔍 Debug entries: {len(st.session_state.debug_info)}")
+                st.text(
+                    "📋 Session State:\n"
+                    f"💬 Messages: {len(st.session_state.messages)}\n"
+                    f"🔍 Debug entries: {len(st.session_state.debug_info)}"
+                )
             
             # Debug history with live updates
             if st.session_state.debug_info:
@@ -174,10 +285,12 @@ class SimpleMCPApp:
                     # Show tool calls
                     if "tool_calls" in latest_debug and latest_debug["tool_calls"]:
                         st.text("🛠️ Tool Calls:")
+                        tool_calls_json = latest_debug.get("tool_calls_json", [])
                         for i, tool_call in enumerate(latest_debug["tool_calls"]):
                             st.text(f"Tool {i+1}: {tool_call.get('name', 'Unknown')}")
                             if 'arguments' in tool_call:
-                                st.code(json.dumps(tool_call['arguments'], indent=2), language="json")
+                                arguments_json = tool_calls_json[i] if i < len(tool_calls_json) else json.dumps(tool_call['arguments'], indent=2)
+                                st.code(arguments_json, language="json")
                     
                     # Show raw response
                     if "raw_response" in latest_debug:
@@ -197,23 +310,27 @@ class SimpleMCPApp:
                 # Show all debug entries
                 if len(st.session_state.debug_info) > 1:
                     with st.expander(f"📚 Debug History ({len(st.session_state.debug_info)} entries)", expanded=False):
-                        for i, debug_entry in enumerate(reversed(st.session_state.debug_info[:-1])):
-                            st.text(f"Entry {len(st.session_state.debug_info) - i - 1}:")
-                            st.text(f"  Request: {debug_entry.get('request', 'N/A')[:50]}...")
-                            st.text(f"  Timing: {debug_entry.get('timing', 0):.2f}s")
+                        history = list(st.session_state.debug_info)[-DEBUG_HISTORY_SHOWN - 1:-1]
+                        history_lines = []
+                        for i, debug_entry in enumerate(reversed(history)):
+                            history_lines.append(f"Entry {len(st.session_state.debug_info) - i - 1}:")
+                            history_lines.append(f"  Request: {debug_entry.get('request', 'N/A')[:50]}...")
+                            history_lines.append(f"  Timing: {debug_entry.get('timing', 0):.2f}s")
                             if debug_entry.get('errors'):
-                                st.text(f"  Errors: {len(debug_entry['errors'])}")
+                                history_lines.append(f"  Errors: {len(debug_entry['errors'])}")
+                        st.text("\n".join(history_lines))
                         
                 # Clear debug button
                 if st.button("🗑️ Clear Debug", key="clear_debug"):
-                    st.session_state.debug_info = []
+                    st.session_state.debug_info.clear()
                     st.rerun()
             else:
                 st.info("No debug information available yet. Start a conversation to see debug data.")
                 
             # Auto-refresh toggle
-            auto_refresh = st.checkbox("🔄 Auto-refresh debug info", value=False, key="auto_refresh_debug")
-            if auto_refresh:
+            auto_refresh_toggle = st.checkbox("🔄 Auto-refresh debug info", value=False, key="auto_refresh_debug")
+            if auto_refresh_toggle != auto_refresh:
+                # One full rerun so the fragment is rebuilt with the new refresh interval
                 st.rerun()
                 
     def render_login_info(self):
@@ -236,6 +353,7 @@ class SimpleMCPApp:
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("🔄 Refresh", key="refresh_auth"):
+                    self.sso_authenticator.invalidate_identity(current_profile)
                     st.rerun()
             with col2:
                 if st.button("🚪 Logout", key="logout_btn"):
@@ -255,19 +373,19 @@ class SimpleMCPApp:
         with col1:
             if st.button("🗑️ Clear Chat", key="clear_chat"):
                 st.session_state.messages = []
-                st.session_state.debug_info = []
+                st.session_state.pop("_history_blob", None)
+                st.session_state.debug_info.clear()
                 st.success("Chat cleared!")
                 st.rerun()
                 
         with col2:
             if st.button("🔄 Restart", key="restart_app"):
                 # Clear all session state
-                for key in list(st.session_state.keys()):
-                    if key not in ["show_debug"]:  # Keep debug preference
-                        del st.session_state[key]
+                self.reset_session_state()
                 st.success("Application restarted!")
                 st.rerun()
                 
+    @st.fragment
     def render_mcp_server_info(self):
         """Render MCP server connection information."""
         st.subheader("📡 MCP Servers")
@@ -279,16 +397,11 @@ class SimpleMCPApp:
             server_count = getattr(mcp_client, 'servers_count', 0)
             
             if server_count > 0:
-                # Get server status
-                server_status = {}
-                if hasattr(mcp_client, 'get_server_status'):
-                    try:
-                        server_status = mcp_client.get_server_status()
-                    except:
-                        server_status = {}
+                # Get server status (read from client state, no server round trip)
+                server_status = mcp_client.get_server_status()
                 
                 # Count connected servers
-                connected_count = len([s for s in server_status.values() if "🟢" in s])
+                connected_count = mcp_client.connected_count
                 
                 # Show overall status
                 if connected_count == server_count:
@@ -310,18 +423,11 @@ class SimpleMCPApp:
                             st.text(f"🔄 {server_name} (Initializing)")
                             
                     # Show tools per server
-                    tools = getattr(mcp_client, 'tools', {})
-                    if tools:
+                    tool_counts = mcp_client.tool_counts
+                    if tool_counts:
                         st.text("")
                         st.text("🛠️ Tools by Server:")
-                        servers = {}
-                        for tool_name in tools.keys():
-                            server_name = tool_name.split(':')[0] if ':' in tool_name else 'unknown'
-                            if server_name not in servers:
-                                servers[server_name] = 0
-                            servers[server_name] += 1
-                        
-                        for server_name, tool_count in servers.items():
+                        for server_name, tool_count in tool_counts.items():
                             st.text(f"  📡 {server_name}: {tool_count} tools")
             else:
                 # Check if we have config servers
@@ -338,6 +444,7 @@ class SimpleMCPApp:
         else:
             st.info("⏳ MCP client not initialized")
             
+    @st.fragment
     def render_tools_compact(self):
         """Render available tools in compact format with server grouping."""
         st.subheader("🛠️ Available Tools")
@@ -346,13 +453,8 @@ class SimpleMCPApp:
             tools = getattr(st.session_state.mcp_client, 'tools', {})
             
             if tools:
-                # Group tools by server
-                servers = {}
-                for tool_name, tool_info in tools.items():
-                    server_name = tool_name.split(':')[0] if ':' in tool_name else 'unknown'
-                    if server_name not in servers:
-                        servers[server_name] = []
-                    servers[server_name].append((tool_name, tool_info))
+                # Tools grouped by server, cached on the client
+                servers = st.session_state.mcp_client.tool_groups
                 
                 # Show summary
                 total_tools = len(tools)
@@ -371,31 +473,59 @@ class SimpleMCPApp:
         else:
             st.text("⏳ Initializing...")
             
+    def reset_session_state(self):
+        """Clear session state, keeping only the preserved preferences."""
+        preserved = {key: st.session_state[key] for key in PRESERVED_SESSION_KEYS if key in st.session_state}
+        st.session_state.clear()
+        st.session_state.update(preserved)
+        
     def logout_user(self):
         """Handle user logout."""
         # Logout from SSO
         self.sso_authenticator.logout_sso()
         
+        # Drop cached sessions so stale credentials are not reused
+        _get_boto_session.clear()
+        
+        # Shut the MCP servers down unless another session still uses them
+        if "mcp_client_key" in st.session_state:
+            _release_mcp_client(st.session_state.mcp_client_key)
+        
         # Clear environment variables
         for var in ["AWS_PROFILE", "AWS_REGION", "AWS_DEFAULT_REGION"]:
             if var in os.environ:
                 del os.environ[var]
         
         # Clear session state
-        for key in list(st.session_state.keys()):
-            if key not in ["show_debug"]:  # Keep debug preference
-                del st.session_state[key]
+        self.reset_session_state()
                 
         st.session_state.authenticated = False
         st.success("✅ Logged out successfully!")
         st.rerun()
         
+    def _older_messages_blob(self, count: int) -> str:
+        """Join the first `count` messages into one markdown block, cached until the count changes."""
+        cached = st.session_state.get("_history_blob")
+        if cached is None or cached[0] != count:
+            icons = {"user": "👤", "assistant": "🤖"}
+            blob = "\n\n---\n\n".join(
+                f"{icons.get(message['role'], '💬')} {message['content']}"
+                for message in st.session_state.messages[:count]
+            )
+            cached = st.session_state["_history_blob"] = (count, blob)
+        return cached[1]
+        
     def render_chat_interface(self):
         """Render the main chat interface."""
         st.title("💬 Chat with AWS")
         
         # Display chat messages
-        for message in st.session_state.messages:
+        messages = st.session_state.messages
+        older_count = max(0, len(messages) - CHAT_HISTORY_LIVE)
+        if older_count:
+            with st.expander(f"🕘 Earlier messages ({older_count})", expanded=False):
+                st.markdown(self._older_messages_blob(older_count))
+        for message in messages[older_count:]:
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
         
@@ -414,11 +544,14 @@ class SimpleMCPApp:
                     try:
                         start_time = time.time()
                         
-                        # Process with agent using async handler correctly
-                        response = streamlit_async_handler.run_async(
-                            st.session_state.agent.process_message(prompt),
-                            timeout=120
-                        )
+                        # Stream the response as Bedrock generates it, once a request slot is free
+                        with self.admission.slot(timeout=120):
+                            response = st.write_stream(
+                                streamlit_async_handler.iter_async(
+                                    st.session_state.agent.process_message_stream(prompt),
+                                    timeout=120
+                                )
+                            )
                         
                         end_time = time.time()
                         response_time = end_time - start_time
@@ -434,12 +567,14 @@ class SimpleMCPApp:
                         # Try to get tool calls from agent if available
                         if hasattr(st.session_state.agent, '_last_tool_calls'):
                             debug_info["tool_calls"] = st.session_state.agent._last_tool_calls
+                            # Serialize once here rather than on every sidebar rerun
+                            debug_info["tool_calls_json"] = [
+                                json.dumps(tool_call.get('arguments', {}), indent=2)
+                                for tool_call in debug_info["tool_calls"]
+                            ]
                         
                         st.session_state.debug_info.append(debug_info)
                         
-                        # Display response
-                        st.markdown(response)
-                        
                         # Add to messages
                         st.session_state.messages.append({
                             "role": "assistant", 
@@ -465,10 +600,16 @@ class SimpleMCPApp:
                             "content": error_msg
                         })
                         
-    async def run(self):
+    def run(self):
         """Run the application."""
         try:
-            # Check authentication
+            # With a profile already in the environment, spawn the MCP servers while
+            # the login page and first render run instead of after them
+            aws_env = (os.environ.get("AWS_PROFILE"), os.environ.get("AWS_REGION"))
+            if self.app_config.prewarm_mcp and aws_env[0]:
+                _prewarm_mcp_client(*aws_env)
+                
+            # Check authentication (cached per profile, shared with the sidebar)
             if not self.sso_authenticator.is_authenticated():
                 # Show SSO login UI in main area
                 st.title("🔐 AWS SSO Authentication Required")
@@ -482,7 +623,7 @@ class SimpleMCPApp:
                     
             # Initialize components
             with st.spinner("Initializing MCP servers..."):
-                await self.initialize_components()
+                self.initialize_components()
             
             # Render UI
             self.render_sidebar()
@@ -494,10 +635,10 @@ class SimpleMCPApp:
             st.error(f"Application error: {e}")
             logger.error(f"Application error: {e}")
 
-async def main():
+def main():
     """Main application entry point."""
     app = SimpleMCPApp()
-    await app.run()
+    app.run()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
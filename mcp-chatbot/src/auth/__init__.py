@@ -1,5 +1,5 @@
 """Authentication components for AWS MCP Agent."""
 
-from .aws_sso_auth import AWSSSOAuthenticator
+from .aws_sso_auth import AWSSSOAuthenticator, get_authenticator
 
-__all__ = ['AWSSSOAuthenticator']
+__all__ = ['AWSSSOAuthenticator', 'get_authenticator']
@@ -4,18 +4,96 @@ Provides UI-based AWS SSO login functionality
 """
 
 import streamlit as st
-import boto3
+import hashlib
 import json
 import os
+import queue
+import re
 import subprocess
 import time
 import logging
-from typing import Optional, Dict, Any
-from datetime import datetime, timezone
+import shutil
+import tempfile
+import threading
+import types
+import contextlib
+from typing import Callable, Optional, Dict, Any, Mapping, Tuple
+from datetime import datetime, timedelta, timezone
 import configparser
 
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+AWS_HOME = os.path.expanduser("~/.aws")
+CONFIG_FILE = os.path.join(AWS_HOME, "config")
+CREDENTIALS_FILE = os.path.join(AWS_HOME, "credentials")
+
+# Parsed SSO profiles per config path, keyed on the file's (mtime_ns, size)
+_CONFIG_CACHE: Dict[str, Tuple[int, int, Mapping[str, Mapping[str, str]]]] = {}
+# Section names per credentials path, keyed the same way
+_CREDENTIALS_CACHE: Dict[str, Tuple[int, int, Tuple[str, ...]]] = {}
+_CACHE_LOCK = threading.Lock()
+
+# Serializes config edits between script threads; fcntl covers other processes
+_WRITE_LOCK = threading.Lock()
+
+# Read-path parser for ~/.aws/config: only the SSO keys are needed, so a regex
+# scan replaces configparser (which is still used to write the file)
+SECTION_RE = re.compile(r'^\[(?:profile\s+)?([^\]]+)\][ \t]*$', re.M)
+KV_RE = re.compile(r'^(\w+)[ \t]*[=:][ \t]*(.*?)[ \t]*$', re.M)
+SSO_PROFILE_KEYS = frozenset({'sso_start_url', 'sso_region', 'sso_account_id', 'sso_role_name', 'region', 'sso_session'})
+
+# Validation patterns for the new-profile form
+_SSO_URL_RE = re.compile(r'^https://[\w.-]+\.awsapps\.com/start/?(?:#/?)?$')
+_REGION_RE = re.compile(r'^(?:us|eu|ap|ca|sa|af|me|il|mx)(?:-gov)?-[a-z]+-\d+$')
+_ACCT_RE = re.compile(r'^\d{12}$')
+_ROLE_RE = re.compile(r'^[\w+=,.@-]{1,64}$')
+
+# In-flight device-authorization logins per profile, polled by a background thread
+_PENDING_LOGINS: Dict[str, Dict[str, Any]] = {}
+_LOGIN_LOCK = threading.Lock()
+
+# Seconds an STS identity lookup (or its failure) is reused for a profile
+IDENTITY_TTL = 60
+
+# boto3 sessions and STS clients per (profile, account, role); building a Session
+# re-reads the AWS config files. The account/role pair keeps an edited profile
+# from hitting entries built for its previous target.
+_STS_CACHE: Dict[Tuple[str, str, str], Any] = {}
+_SESSION_LOCK = threading.Lock()
+
+
+def _get_sts(profile_name: str, account_id: str = '', role_name: str = ''):
+    """Get the cached STS client for a profile, building its session on first use."""
+    key = (profile_name, account_id, role_name)
+    with _SESSION_LOCK:
+        sts = _STS_CACHE.get(key)
+        if sts is None:
+            import boto3  # Deferred: only needed once a profile is actually checked
+            sts = _STS_CACHE[key] = boto3.Session(profile_name=profile_name).client('sts')
+        return sts
+
+
+# Module-level so the cache outlives the authenticator, which the app rebuilds every rerun
+@st.cache_data(ttl=IDENTITY_TTL, show_spinner=False)
+def _cached_caller_identity(profile_name: str, account_id: str = '',
+                            role_name: str = '') -> Optional[Dict[str, str]]:
+    """Look up the STS caller identity for a profile; None if it is not authenticated."""
+    try:
+        identity = _get_sts(profile_name, account_id, role_name).get_caller_identity()
+        return {
+            'account': identity.get('Account', ''),
+            'user_id': identity.get('UserId', ''),
+            'arn': identity.get('Arn', '')
+        }
+    except Exception as e:
+        logger.debug(f"Could not get identity for {profile_name}: {e}")
+        return None
+
 
 class AWSSSOAuthenticator:
     """
@@ -23,34 +101,97 @@ class AWSSSOAuthenticator:
     """
     
     def __init__(self):
-        self.aws_home = os.path.expanduser("~/.aws")
-        self.config_file = os.path.join(self.aws_home, "config")
-        self.credentials_file = os.path.join(self.aws_home, "credentials")
+        self.aws_home = AWS_HOME
+        self.config_file = CONFIG_FILE
+        self.credentials_file = CREDENTIALS_FILE
+        
+    def get_available_sso_profiles(self) -> Dict[str, Mapping[str, str]]:
+        """
+        Get available SSO profiles from AWS config.
         
-    def get_available_sso_profiles(self) -> Dict[str, Dict[str, str]]:
-        """Get available SSO profiles from AWS config."""
+        The parse is cached until the config file's mtime or size changes.
+        Profile entries are read-only views shared between callers.
+        """
+        return dict(self._cached_sso_profiles())
+        
+    def has_sso_profile(self, profile_name: str) -> bool:
+        """Check whether an SSO profile exists without copying the profile map."""
+        return profile_name in self._cached_sso_profiles()
+        
+    def _cached_sso_profiles(self) -> Mapping[str, Mapping[str, str]]:
+        """Get the shared read-only profile map, re-parsing only if the config changed."""
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return types.MappingProxyType({})
+            
+        with _CACHE_LOCK:
+            cached = _CONFIG_CACHE.get(self.config_file)
+            if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                return cached[2]
+                
+        sso_profiles = types.MappingProxyType({
+            name: types.MappingProxyType(info)
+            for name, info in self._read_sso_profiles().items()
+        })
+        with _CACHE_LOCK:
+            _CONFIG_CACHE[self.config_file] = (stat.st_mtime_ns, stat.st_size, sso_profiles)
+        return sso_profiles
+        
+    def get_credential_profiles(self) -> Tuple[str, ...]:
+        """
+        Get profiles defined in ~/.aws/credentials, which the SSO list does not cover.
+        
+        Section headers are scanned in-process and cached like the config parse,
+        rather than spawning 'aws configure list-profiles' on every render.
+        """
+        try:
+            stat = os.stat(self.credentials_file)
+        except OSError:
+            return ()
+            
+        with _CACHE_LOCK:
+            cached = _CREDENTIALS_CACHE.get(self.credentials_file)
+            if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                return cached[2]
+                
+        try:
+            with open(self.credentials_file, encoding='utf-8') as f:
+                names = tuple(m.group(1).strip() for m in SECTION_RE.finditer(f.read()))
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f"💥 [SSO] Error reading AWS credentials: {e}")
+            return ()
+            
+        with _CACHE_LOCK:
+            _CREDENTIALS_CACHE[self.credentials_file] = (stat.st_mtime_ns, stat.st_size, names)
+        return names
+        
+    def _read_sso_profiles(self) -> Dict[str, Dict[str, str]]:
+        """Parse SSO profiles from the AWS config file in a single regex pass."""
         sso_profiles = {}
         
-        if not os.path.exists(self.config_file):
-            return sso_profiles
-            
         try:
-            config = configparser.ConfigParser()
-            config.read(self.config_file)
-            
-            for section_name in config.sections():
-                section = config[section_name]
+            with open(self.config_file, encoding='utf-8') as f:
+                text = f.read()
+                
+            sections = list(SECTION_RE.finditer(text))
+            for i, section in enumerate(sections):
+                body_end = sections[i + 1].start() if i + 1 < len(sections) else len(text)
+                values = {
+                    key.lower(): value
+                    for key, value in KV_RE.findall(text, section.end(), body_end)
+                    if key.lower() in SSO_PROFILE_KEYS
+                }
                 
                 # Check if this is an SSO profile
-                if 'sso_start_url' in section:
-                    profile_name = section_name.replace('profile ', '') if section_name.startswith('profile ') else section_name
-                    
-                    sso_profiles[profile_name] = {
-                        'sso_start_url': section.get('sso_start_url', ''),
-                        'sso_region': section.get('sso_region', ''),
-                        'sso_account_id': section.get('sso_account_id', ''),
-                        'sso_role_name': section.get('sso_role_name', ''),
-                        'region': section.get('region', 'ca-central-1')
+                if 'sso_start_url' in values:
+                    sso_profiles[section.group(1).strip()] = {
+                        'sso_start_url': values.get('sso_start_url', ''),
+                        'sso_region': values.get('sso_region', ''),
+                        'sso_account_id': values.get('sso_account_id', ''),
+                        'sso_role_name': values.get('sso_role_name', ''),
+                        'region': values.get('region', 'ca-central-1'),
+                        'sso_session': values.get('sso_session', '')
                     }
                     
         except Exception as e:
@@ -60,52 +201,253 @@ class AWSSSOAuthenticator:
         
     def is_profile_authenticated(self, profile_name: str) -> bool:
         """Check if an SSO profile is currently authenticated."""
+        return self.get_profile_identity(profile_name) is not None
+            
+    def get_profile_identity(self, profile_name: str) -> Optional[Dict[str, str]]:
+        """Get the identity information for a profile, cached for IDENTITY_TTL seconds."""
+        profile = self._cached_sso_profiles().get(profile_name)
+        if profile is not None and not self.has_valid_sso_token(profile):
+            # No usable SSO token on disk, so STS would only fail after a round trip
+            return None
+        return _cached_caller_identity(profile_name, *self._profile_scope(profile_name))
+        
+    def _sso_token_path(self, profile: Mapping[str, str]) -> str:
+        """Get the SSO token cache file the AWS CLI uses for a profile."""
+        # sso-session profiles are cached under the session name, legacy ones under the start URL
+        cache_key = profile.get('sso_session') or profile.get('sso_start_url', '')
+        cache_name = hashlib.sha1(cache_key.encode('utf-8')).hexdigest()
+        return os.path.join(self.aws_home, 'sso', 'cache', f"{cache_name}.json")
+        
+    def has_valid_sso_token(self, profile: Mapping[str, str]) -> bool:
+        """Check the local SSO token cache for an unexpired token, without any network call."""
         try:
-            # Try to get caller identity with the profile
-            session = boto3.Session(profile_name=profile_name)
-            sts = session.client('sts')
-            sts.get_caller_identity()
-            return True
-        except Exception as e:
-            logger.debug(f"Profile {profile_name} not authenticated: {e}")
+            with open(self._sso_token_path(profile), encoding='utf-8') as f:
+                expires_at = json.load(f)['expiresAt']
+        except (OSError, ValueError, KeyError, TypeError):
             return False
             
-    def get_profile_identity(self, profile_name: str) -> Optional[Dict[str, str]]:
-        """Get the identity information for a profile."""
         try:
-            session = boto3.Session(profile_name=profile_name)
-            sts = session.client('sts')
-            identity = sts.get_caller_identity()
-            return {
-                'account': identity.get('Account', ''),
-                'user_id': identity.get('UserId', ''),
-                'arn': identity.get('Arn', '')
-            }
+            expiry = datetime.fromisoformat(expires_at.replace('UTC', '+00:00').replace('Z', '+00:00'))
+        except (AttributeError, ValueError):
+            return True  # Unknown format: let STS decide
+        if expiry.tzinfo is None:
+            expiry = expiry.replace(tzinfo=timezone.utc)
+        return expiry > datetime.now(timezone.utc)
+        
+    def _profile_scope(self, profile_name: str) -> Tuple[str, str]:
+        """Get the (account ID, role name) a profile currently points at."""
+        profile = self._cached_sso_profiles().get(profile_name, {})
+        return profile.get('sso_account_id', ''), profile.get('sso_role_name', '')
+        
+    def _evict_sessions(self, profile_name: Optional[str] = None):
+        """Drop cached sessions for one profile, or for all profiles."""
+        with _SESSION_LOCK:
+            if profile_name is None:
+                _STS_CACHE.clear()
+            else:
+                for key in [key for key in _STS_CACHE if key[0] == profile_name]:
+                    del _STS_CACHE[key]
+                    
+    def invalidate_identity(self, profile_name: Optional[str] = None):
+        """Drop cached identity for one profile, or for all profiles."""
+        if profile_name is None:
+            _cached_caller_identity.clear()
+        else:
+            _cached_caller_identity.clear(profile_name, *self._profile_scope(profile_name))
+            
+    def start_device_login(self, profile_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Start an in-process SSO OIDC device-authorization login for a profile.
+        
+        The token is polled for on a background thread and written to the SSO
+        token cache in the format the AWS CLI uses, so boto3 sessions for the
+        profile pick it up.
+        
+        Returns:
+            The pending login state (verification URL, user code, status), or
+            None if this profile must use the AWS CLI login instead
+        """
+        profile = self.get_available_sso_profiles().get(profile_name)
+        if not profile or profile.get('sso_session') or not profile.get('sso_region'):
+            # sso-session profiles use a different token cache key; leave those to the CLI
+            return None
+            
+        with _LOGIN_LOCK:
+            pending = _PENDING_LOGINS.get(profile_name)
+            if pending and pending['status'] == 'pending':
+                return pending
+                
+        try:
+            import boto3
+            oidc = boto3.client('sso-oidc', region_name=profile['sso_region'])
+            registration = oidc.register_client(clientName='mcp-chatbot', clientType='public')
+            authorization = oidc.start_device_authorization(
+                clientId=registration['clientId'],
+                clientSecret=registration['clientSecret'],
+                startUrl=profile['sso_start_url']
+            )
         except Exception as e:
-            logger.debug(f"Could not get identity for {profile_name}: {e}")
+            logger.warning(f"⚠️ [SSO] Device authorization unavailable for {profile_name}, using AWS CLI: {e}")
             return None
             
-    def login_sso_profile(self, profile_name: str) -> bool:
-        """Login to AWS SSO for a specific profile."""
+        pending = {
+            'status': 'pending',
+            'error': None,
+            'verification_uri': authorization.get('verificationUriComplete') or authorization['verificationUri'],
+            'user_code': authorization['userCode'],
+        }
+        with _LOGIN_LOCK:
+            _PENDING_LOGINS[profile_name] = pending
+            
+        threading.Thread(
+            target=self._poll_device_token,
+            args=(profile_name, profile, oidc, registration, authorization, pending),
+            name=f"sso-login-{profile_name}",
+            daemon=True
+        ).start()
+        logger.info(f"🔐 [SSO] Device authorization started for {profile_name}")
+        return pending
+        
+    def get_pending_login(self, profile_name: str) -> Optional[Dict[str, Any]]:
+        """Get the state of a device-authorization login started for a profile."""
+        with _LOGIN_LOCK:
+            return _PENDING_LOGINS.get(profile_name)
+            
+    def clear_pending_login(self, profile_name: str):
+        """Forget a finished or abandoned device-authorization login."""
+        with _LOGIN_LOCK:
+            _PENDING_LOGINS.pop(profile_name, None)
+            
+    def _poll_device_token(self, profile_name: str, profile: Mapping[str, str], oidc,
+                           registration: Dict[str, Any], authorization: Dict[str, Any],
+                           pending: Dict[str, Any]):
+        """Poll create_token until the user approves, then write the token cache."""
+        interval = authorization.get('interval', 5)
+        deadline = time.monotonic() + authorization.get('expiresIn', 600)
+        
+        while time.monotonic() < deadline:
+            try:
+                token = oidc.create_token(
+                    grantType='urn:ietf:params:oauth:grant-type:device_code',
+                    deviceCode=authorization['deviceCode'],
+                    clientId=registration['clientId'],
+                    clientSecret=registration['clientSecret']
+                )
+            except oidc.exceptions.AuthorizationPendingException:
+                time.sleep(interval)
+                continue
+            except oidc.exceptions.SlowDownException:
+                interval += 5
+                time.sleep(interval)
+                continue
+            except Exception as e:
+                logger.error(f"❌ [SSO] Device login failed for {profile_name}: {e}")
+                pending.update(status='failed', error=str(e))
+                return
+                
+            try:
+                self._write_sso_token_cache(profile, token)
+            except Exception as e:
+                logger.error(f"💥 [SSO] Could not write token cache for {profile_name}: {e}")
+                pending.update(status='failed', error=str(e))
+                return
+                
+            self.invalidate_identity(profile_name)
+            self._evict_sessions(profile_name)
+            pending['status'] = 'success'
+            logger.info(f"✅ [SSO] Device login successful for {profile_name}")
+            return
+            
+        pending.update(status='failed', error="Device authorization expired")
+        logger.error(f"⏰ [SSO] Device authorization expired for {profile_name}")
+        
+    def _write_sso_token_cache(self, profile: Mapping[str, str], token: Dict[str, Any]):
+        """Write an access token to ~/.aws/sso/cache the way the AWS CLI does for legacy profiles."""
+        token_path = self._sso_token_path(profile)
+        cache_dir = os.path.dirname(token_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=token['expiresIn'])
+        entry = {
+            'startUrl': profile['sso_start_url'],
+            'region': profile['sso_region'],
+            'accessToken': token['accessToken'],
+            'expiresAt': expires_at.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        }
+        
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, token_path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+            
+    def login_sso_profile(self, profile_name: str,
+                          on_output: Optional[Callable[[str], None]] = None,
+                          timeout: int = 300) -> bool:
+        """
+        Login to AWS SSO for a specific profile through the AWS CLI (blocking fallback).
+        
+        Args:
+            profile_name: Profile to log in
+            on_output: Called with each line the CLI prints, as it is printed,
+                so the device-authorization URL and code can be shown right away
+            timeout: Seconds to wait for the login to finish
+            
+        Returns:
+            True if successful, False otherwise
+        """
         try:
             logger.info(f"🔐 Starting SSO login for profile: {profile_name}")
             
             # Run aws sso login command
             cmd = ["aws", "sso", "login", "--profile", profile_name]
-            
-            # Use subprocess to run the command
-            process = subprocess.run(
+            process = subprocess.Popen(
                 cmd,
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 text=True,
-                timeout=300  # 5 minute timeout
+                bufsize=1
             )
             
-            if process.returncode == 0:
+            # Read on a thread so the timeout holds even while the CLI is silent
+            lines: "queue.Queue[Optional[str]]" = queue.Queue()
+            
+            def pump():
+                for line in process.stdout:
+                    lines.put(line.rstrip())
+                lines.put(None)
+                
+            threading.Thread(target=pump, name=f"sso-cli-{profile_name}", daemon=True).start()
+            
+            output = []
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    process.kill()
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+                try:
+                    line = lines.get(timeout=min(remaining, 0.5))
+                except queue.Empty:
+                    continue
+                if line is None:
+                    break
+                output.append(line)
+                if on_output:
+                    on_output(line)
+                    
+            returncode = process.wait(timeout=max(deadline - time.monotonic(), 1))
+            if returncode == 0:
                 logger.info(f"✅ SSO login successful for {profile_name}")
+                self.invalidate_identity(profile_name)
+                self._evict_sessions(profile_name)
                 return True
             else:
-                logger.error(f"❌ SSO login failed for {profile_name}: {process.stderr}")
+                logger.error(f"❌ SSO login failed for {profile_name}: {' '.join(output[-5:])}")
                 return False
                 
         except subprocess.TimeoutExpired:
@@ -119,6 +461,8 @@ class AWSSSOAuthenticator:
         """Logout from AWS SSO."""
         try:
             logger.info("🔐 Logging out from AWS SSO")
+            self.invalidate_identity()
+            self._evict_sessions()
             
             cmd = ["aws", "sso", "logout"]
             process = subprocess.run(
@@ -162,29 +506,40 @@ class AWSSSOAuthenticator:
             # Ensure AWS config directory exists
             os.makedirs(self.aws_home, exist_ok=True)
             
-            # Read existing config
-            config = configparser.ConfigParser()
-            if os.path.exists(self.config_file):
-                config.read(self.config_file)
-            
-            # Create new profile section
             section_name = f"profile {profile_name}" if profile_name != "default" else "default"
+            values = {
+                'sso_start_url': sso_start_url,
+                'sso_region': sso_region,
+                'sso_account_id': sso_account_id,
+                'sso_role_name': sso_role_name,
+                'region': region,
+                'output': 'json',
+            }
             
-            if section_name not in config:
-                config.add_section(section_name)
-            
-            # Set SSO configuration
-            config.set(section_name, 'sso_start_url', sso_start_url)
-            config.set(section_name, 'sso_region', sso_region)
-            config.set(section_name, 'sso_account_id', sso_account_id)
-            config.set(section_name, 'sso_role_name', sso_role_name)
-            config.set(section_name, 'region', region)
-            config.set(section_name, 'output', 'json')
-            
-            # Write back to config file
-            with open(self.config_file, 'w') as f:
-                config.write(f)
+            with self._config_write_lock():
+                # Drop entries for the profile's previous target before the config changes
+                self._evict_sessions(profile_name)
+                self.invalidate_identity(profile_name)
                 
+                try:
+                    with open(self.config_file, encoding='utf-8') as f:
+                        text = f.read()
+                except FileNotFoundError:
+                    text = ''
+                    
+                if profile_name not in {m.group(1).strip() for m in SECTION_RE.finditer(text)}:
+                    # New section: append it, leaving the rest of the file untouched
+                    self._append_config_section(section_name, values, text)
+                else:
+                    # Existing section: update it in place through a full rewrite
+                    config = configparser.ConfigParser()
+                    config.read_string(text, source=self.config_file)
+                    if not config.has_section(section_name):
+                        config.add_section(section_name)
+                    for key, value in values.items():
+                        config.set(section_name, key, value)
+                    self._write_config(config)
+                    
             logger.info(f"✅ [SSO] Successfully configured profile: {profile_name}")
             return True
             
@@ -205,28 +560,26 @@ class AWSSSOAuthenticator:
         # Validate SSO start URL
         if not sso_start_url:
             errors['sso_start_url'] = "SSO start URL is required"
-        elif not sso_start_url.startswith('https://'):
-            errors['sso_start_url'] = "SSO start URL must start with https://"
-        elif '.awsapps.com' not in sso_start_url:
-            errors['sso_start_url'] = "SSO start URL should contain .awsapps.com"
+        elif not _SSO_URL_RE.match(sso_start_url):
+            errors['sso_start_url'] = "SSO start URL must look like https://<name>.awsapps.com/start"
             
         # Validate SSO region
         if not sso_region:
             errors['sso_region'] = "SSO region is required"
-        elif not sso_region.startswith(('us-', 'eu-', 'ap-', 'ca-', 'sa-')):
+        elif not _REGION_RE.match(sso_region):
             errors['sso_region'] = "Invalid AWS region format"
             
         # Validate account ID
         if not sso_account_id:
             errors['sso_account_id'] = "Account ID is required"
-        elif not sso_account_id.isdigit() or len(sso_account_id) != 12:
+        elif not _ACCT_RE.match(sso_account_id):
             errors['sso_account_id'] = "Account ID must be 12 digits"
             
         # Validate role name
         if not sso_role_name:
             errors['sso_role_name'] = "Role name is required"
-        elif len(sso_role_name) < 1 or len(sso_role_name) > 64:
-            errors['sso_role_name'] = "Role name must be 1-64 characters"
+        elif not _ROLE_RE.match(sso_role_name):
+            errors['sso_role_name'] = "Role name must be 1-64 letters, digits or +=,.@_- characters"
             
         return errors
             
@@ -299,8 +652,7 @@ class AWSSSOAuthenticator:
                     return False
                 
                 # Check if profile already exists
-                existing_profiles = self.get_available_sso_profiles()
-                if profile_name in existing_profiles:
+                if self.has_sso_profile(profile_name):
                     st.error(f"❌ Profile '{profile_name}' already exists")
                     return False
                 
@@ -343,27 +695,27 @@ class AWSSSOAuthenticator:
         try:
             logger.info(f"🗑️ [SSO] Removing SSO profile: {profile_name}")
             
-            if not os.path.exists(self.config_file):
-                logger.warning(f"⚠️ [SSO] Config file not found: {self.config_file}")
-                return False
-            
-            # Read existing config
-            config = configparser.ConfigParser()
-            config.read(self.config_file)
-            
-            # Determine section name
-            section_name = f"profile {profile_name}" if profile_name != "default" else "default"
-            
-            if section_name not in config:
-                logger.warning(f"⚠️ [SSO] Profile section not found: {section_name}")
-                return False
-            
-            # Remove the section
-            config.remove_section(section_name)
-            
-            # Write back to config file
-            with open(self.config_file, 'w') as f:
-                config.write(f)
+            with self._config_write_lock():
+                # Read existing config; read() returns no files if it is missing
+                config = configparser.ConfigParser()
+                if not config.read(self.config_file):
+                    logger.warning(f"⚠️ [SSO] Config file not found: {self.config_file}")
+                    return False
+                
+                # Determine section name
+                section_name = f"profile {profile_name}" if profile_name != "default" else "default"
+                
+                if section_name not in config:
+                    logger.warning(f"⚠️ [SSO] Profile section not found: {section_name}")
+                    return False
+                
+                # Remove the section
+                config.remove_section(section_name)
+                self._evict_sessions(profile_name)
+                self.invalidate_identity(profile_name)
+                
+                # Write back to config file
+                self._write_config(config)
                 
             logger.info(f"✅ [SSO] Successfully removed profile: {profile_name}")
             return True
@@ -372,19 +724,70 @@ class AWSSSOAuthenticator:
             logger.error(f"💥 [SSO] Error removing profile {profile_name}: {e}")
             return False
             
-    def set_environment_for_profile(self, profile_name: str) -> bool:
+    @contextlib.contextmanager
+    def _config_write_lock(self):
+        """Hold the config edit lock across threads and, where supported, processes."""
+        with _WRITE_LOCK:
+            if fcntl is None:
+                yield
+                return
+            # Lock a sidecar file: the config itself is replaced, so its inode changes
+            with open(f"{self.config_file}.lock", 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    
+    def _append_config_section(self, section_name: str, values: Mapping[str, str], text: str):
+        """Append a new section to the config file, keeping existing comments and layout."""
+        lines = [f"[{section_name}]"] + [f"{key} = {value}" for key, value in values.items()]
+        separator = '' if not text else ('\n' if text.endswith('\n') else '\n\n')
+        with open(self.config_file, 'a', encoding='utf-8') as f:
+            f.write(separator + '\n'.join(lines) + '\n')
+            
+        with _CACHE_LOCK:
+            _CONFIG_CACHE.pop(self.config_file, None)
+            
+    def _write_config(self, config: configparser.ConfigParser):
+        """Write the config to a temp file and atomically swap it into place."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.config_file), prefix=".config.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                config.write(f)
+            try:
+                shutil.copymode(self.config_file, tmp_path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, self.config_file)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+            
+        with _CACHE_LOCK:
+            _CONFIG_CACHE.pop(self.config_file, None)
+            
+    def set_environment_for_profile(self, profile_name: str,
+                                    profile_info: Optional[Mapping[str, str]] = None) -> bool:
         try:
             # Set the AWS profile environment variable
-            os.environ["AWS_PROFILE"] = profile_name
-            
-            # Get the profile's region
-            sso_profiles = self.get_available_sso_profiles()
-            if profile_name in sso_profiles:
-                region = sso_profiles[profile_name].get('region', 'ca-central-1')
-                os.environ["AWS_DEFAULT_REGION"] = region
-                os.environ["AWS_REGION"] = region
+            updates = {"AWS_PROFILE": profile_name}
+            
+            # Get the profile's region, unless the caller already has the profile
+            if profile_info is None:
+                profile_info = self._cached_sso_profiles().get(profile_name)
+            if profile_info is not None:
+                region = profile_info.get('region', 'ca-central-1')
+                # botocore reads AWS_DEFAULT_REGION; AppConfig and MCP servers read AWS_REGION
+                updates["AWS_DEFAULT_REGION"] = region
+                updates["AWS_REGION"] = region
                 
-            logger.info(f"✅ Environment set for profile: {profile_name}")
+            # Runs on every authenticated rerun, so only touch what changed
+            changed = {key: value for key, value in updates.items() if os.environ.get(key) != value}
+            if changed:
+                os.environ.update(changed)
+                logger.info(f"✅ Environment set for profile: {profile_name}")
             return True
             
         except Exception as e:
@@ -410,6 +813,9 @@ class AWSSSOAuthenticator:
                 return False  # New profile form doesn't authenticate immediately
         else:
             st.warning("❌ No AWS SSO profiles found in ~/.aws/config")
+            credential_profiles = self.get_credential_profiles()
+            if credential_profiles:
+                st.caption(f"Static-key profiles in ~/.aws/credentials are not used here: {', '.join(credential_profiles)}")
             st.info("Configure your first SSO profile below:")
             return self.render_new_sso_profile_form()
             
@@ -440,26 +846,38 @@ class AWSSSOAuthenticator:
                 st.write(f"**SSO URL:** {profile_info.get('sso_start_url', 'N/A')}")
             
             # Check authentication status
-            is_authenticated = self.is_profile_authenticated(selected_profile)
+            # One STS lookup answers both "authenticated?" and "as whom?"
+            identity = self.get_profile_identity(selected_profile)
+            is_authenticated = identity is not None
             
             # Action buttons
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
                 if st.button("🔐 Login with SSO", key="sso_login_btn"):
-                    with st.spinner(f"Logging in to {selected_profile}..."):
-                        success = self.login_sso_profile(selected_profile)
-                        
-                        if success:
-                            st.success("✅ SSO login successful!")
-                            # Set environment variables
-                            self.set_environment_for_profile(selected_profile)
-                            st.rerun()
-                        else:
-                            st.error("❌ SSO login failed. Please try again.")
+                    self.clear_pending_login(selected_profile)
+                    if self.start_device_login(selected_profile) is None:
+                        with st.spinner(f"Logging in to {selected_profile}..."):
+                            cli_output = st.empty()
+                            cli_lines = []
+                            
+                            def show_cli_line(line: str):
+                                cli_lines.append(line)
+                                cli_output.text("\n".join(cli_lines[-10:]))
+                                
+                            success = self.login_sso_profile(selected_profile, on_output=show_cli_line)
+                            
+                            if success:
+                                st.success("✅ SSO login successful!")
+                                # Set environment variables
+                                self.set_environment_for_profile(selected_profile, profile_info)
+                                st.rerun()
+                            else:
+                                st.error("❌ SSO login failed. Please try again.")
                             
             with col2:
                 if st.button("🔄 Check Status", key="sso_status_btn"):
+                    self.invalidate_identity(selected_profile)
                     st.rerun()
                     
             with col3:
@@ -492,19 +910,20 @@ class AWSSSOAuthenticator:
                         st.session_state.confirm_remove = True
                         st.warning("⚠️ Click again to confirm removal")
             
+            if self.get_pending_login(selected_profile):
+                self.render_pending_login(selected_profile, profile_info)
+                
             # Show current authentication status
             if is_authenticated:
                 st.success(f"✅ **Authenticated** as profile: `{selected_profile}`")
                 
                 # Show identity information
-                identity = self.get_profile_identity(selected_profile)
-                if identity:
-                    with st.expander("👤 Current Identity", expanded=True):
-                        st.write(f"**Account:** {identity['account']}")
-                        st.write(f"**ARN:** {identity['arn']}")
+                with st.expander("👤 Current Identity", expanded=True):
+                    st.write(f"**Account:** {identity['account']}")
+                    st.write(f"**ARN:** {identity['arn']}")
                         
                 # Set environment for the application
-                self.set_environment_for_profile(selected_profile)
+                self.set_environment_for_profile(selected_profile, profile_info)
                 
                 return True
             else:
@@ -514,6 +933,25 @@ class AWSSSOAuthenticator:
                 
         return False
         
+    @st.fragment(run_every="2s")
+    def render_pending_login(self, profile_name: str, profile_info: Mapping[str, str]):
+        """Show the device code for an in-flight login and poll for its result."""
+        pending = self.get_pending_login(profile_name)
+        if not pending:
+            return
+            
+        if pending['status'] == 'pending':
+            st.info(f"🔑 Approve the sign-in in your browser with code **{pending['user_code']}**")
+            st.link_button("🌐 Open AWS sign-in page", pending['verification_uri'])
+        elif pending['status'] == 'success':
+            self.clear_pending_login(profile_name)
+            st.success("✅ SSO login successful!")
+            self.set_environment_for_profile(profile_name, profile_info)
+            st.rerun()
+        else:
+            self.clear_pending_login(profile_name)
+            st.error(f"❌ SSO login failed: {pending['error']}")
+            
     def get_current_profile(self) -> Optional[str]:
         """Get the currently active AWS profile."""
         return os.environ.get("AWS_PROFILE")
@@ -524,3 +962,9 @@ class AWSSSOAuthenticator:
         if current_profile:
             return self.is_profile_authenticated(current_profile)
         return False
+
+
+@st.cache_resource(show_spinner=False)
+def get_authenticator() -> AWSSSOAuthenticator:
+    """Get the process-wide authenticator; it holds no per-session state."""
+    return AWSSSOAuthenticator()
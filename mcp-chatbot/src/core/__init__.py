@@ -1,7 +1,26 @@
 """Core components for AWS MCP Agent."""
 
-from .isolated_mcp_client import IsolatedMCPClient
-from .agent import SimpleAgent
-from .async_handler import StreamlitAsyncHandler, streamlit_async_handler
+import importlib
+
+# Exports resolved on first access, so importing one submodule (the app loads
+# core.async_handler on the login page) does not pull in boto3 via core.agent
+_EXPORTS = {
+    'IsolatedMCPClient': '.isolated_mcp_client',
+    'SimpleAgent': '.agent',
+    'StreamlitAsyncHandler': '.async_handler',
+    'streamlit_async_handler': '.async_handler',
+}
 
 __all__ = ['IsolatedMCPClient', 'SimpleAgent', 'StreamlitAsyncHandler', 'streamlit_async_handler']
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -3,15 +3,163 @@ Simple Agent - Direct Bedrock integration without LangChain
 Implements the flow: User → Agent → MCP Client → MCP Server → AWS → Response
 """
 
+import asyncio
 import json
 import logging
 import re
+import sys
+import threading
 import time
-from typing import Dict, Any, List, Optional
+import weakref
+from typing import Dict, Any, AsyncIterator, List, Optional, Sequence, Tuple, Union
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+try:
+    import orjson
+    # Faster on multi-KB Bedrock bodies, and dumps() returns the bytes boto3 sends
+    _dumps, _loads = orjson.dumps, orjson.loads
+except ImportError:  # orjson is optional; stdlib json works the same here
+    _dumps, _loads = json.dumps, json.loads
 
 logger = logging.getLogger(__name__)
 
+# Shared client config: a larger connection pool avoids TLS reconnects when the
+# pool overflows under concurrent calls, keepalive holds idle connections open,
+# and adaptive retries back off client-side when Bedrock starts throttling
+BOTO_CLIENT_CONFIG = Config(
+    max_pool_connections=50,
+    retries={"mode": "adaptive", "max_attempts": 5},
+    tcp_keepalive=True,
+)
+
+# Bedrock clients shared by every agent, per boto3 session and then region. Clients
+# are thread-safe once built, but building one from a shared session is not. Sessions
+# are held weakly, so a session dropped on logout (or a throwaway default one) takes
+# its clients, credentials and connection pool with it
+_BEDROCK_CLIENTS: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+_CLIENT_LOCK = threading.Lock()
+
+
+def _get_bedrock_client(session, region: str):
+    """Get the shared Bedrock runtime client for a session and region, building it on first use."""
+    with _CLIENT_LOCK:
+        clients = _BEDROCK_CLIENTS.setdefault(session, {})
+        client = clients.get(region)
+        if client is None:
+            client = clients[region] = session.client(
+                'bedrock-runtime',
+                region_name=region,
+                config=BOTO_CLIENT_CONFIG
+            )
+        return client
+
+
+# Read-only requests common enough to map to a CLI command without asking the
+# model. Matched against the whole message (English or French); anything that
+# does not match exactly still goes through Bedrock intent analysis.
+_REGION = r'(?:\s+(?:in|dans)\s+(?P<region>[a-z]{2}(?:-gov)?-[a-z]+-\d))?'
+_LIST = r'(?:list|show|describe|liste[rz]?|affiche[rz]?)\s+(?:me\s+|moi\s+)?(?:my\s+|all\s+|the\s+|mes\s+|les\s+|tous\s+les\s+)?'
+_FAST_INTENTS = [
+    (re.compile(_LIST + r'(?:s3\s+buckets?|buckets?\s+s3)', re.I), "aws s3 ls"),
+    (re.compile(_LIST + r'(?:ec2\s+instances?|instances?(?:\s+ec2)?)' + _REGION, re.I), "aws ec2 describe-instances"),
+    (re.compile(_LIST + r'vpcs?' + _REGION, re.I), "aws ec2 describe-vpcs"),
+]
+
+# Parameter names the model tends to use instead of the ones the official servers expect
+_ARG_ALIASES: Dict[str, Dict[str, str]] = {
+    "aws-api:call_aws": {"command": "cli_command"},
+    "aws-api:suggest_aws_commands": {"command": "query"},
+    "aws-docs:search_documentation": {"search": "search_phrase"},
+}
+
+# Intent-analysis instructions. The tool list goes after them in its own system
+# block, so a tool change leaves this prefix cacheable
+_INTENT_SYSTEM_PROMPT = """Analyze the user request and determine if AWS tools are needed.
+
+CONVERSATION CONTEXT: You are having an ongoing conversation about AWS infrastructure. Consider previous context when making decisions.
+
+IMPROVED DECISION MAKING:
+1. PREFER call_aws when you know the exact command needed
+2. Use suggest_aws_commands only when truly uncertain
+3. For common operations (create/delete/list), use call_aws directly
+4. Remember context from previous messages (VPC IDs, resource names, etc.)
+
+CONTEXT-AWARE EXAMPLES:
+- If user mentioned a VPC ID earlier, use it in subsequent commands
+- If creating subnets, include --vpc-id parameter
+- If user asks for "the same region", use ca-central-1
+- For availability zones, use ca-central-1a, ca-central-1b, ca-central-1d
+
+COMMON AWS OPERATIONS - USE call_aws DIRECTLY:
+- Create subnet: aws ec2 create-subnet --vpc-id <vpc-id> --cidr-block <cidr> --availability-zone <az>
+- Delete VPC: aws ec2 delete-vpc --vpc-id <vpc-id>
+- List instances: aws ec2 describe-instances
+- List S3 buckets: aws s3 ls
+- Create IAM role: Use suggest_aws_commands (complex multi-step)
+
+IMPORTANT - Use these EXACT parameter names:
+- For aws-api:call_aws → use "cli_command" (not "command")
+- For aws-api:suggest_aws_commands → use "query" (not "command")
+- For aws-docs:read_documentation → use "url", "max_length", "start_index"
+- For aws-docs:search_documentation → use "search_phrase", "limit"
+- For aws-docs:recommend → use "url"
+
+CRITICAL AWS CLI RULES:
+- For IAM role creation: Use ONLY aws iam create-role with --role-name and --assume-role-policy-document
+- To attach policies: Use separate aws iam attach-role-policy command
+- DO NOT use --managed-policy-arns with create-role (not supported)
+- For complex operations requiring multiple steps, use suggest_aws_commands instead of call_aws
+
+Examples of CORRECT IAM commands:
+- Create role: aws iam create-role --role-name MyRole --assume-role-policy-document file://trust-policy.json
+- Attach policy: aws iam attach-role-policy --role-name MyRole --policy-arn arn:aws:iam::aws:policy/ReadOnlyAccess
+
+Respond with JSON only:
+{
+    "needs_tools": true/false,
+    "reasoning": "explanation of why tools are/aren't needed and which tool is most appropriate",
+    "tool_calls": [
+        {
+            "name": "server_name:tool_name",
+            "arguments": {"correct_parameter_name": "value"}
+        }
+    ]
+}
+
+IMPROVED EXAMPLES:
+- "List my S3 buckets" → needs aws-api:call_aws with {"cli_command": "aws s3 ls"}
+- "Create subnet in ca-central-1a" → needs aws-api:call_aws with {"cli_command": "aws ec2 create-subnet --vpc-id <vpc-id> --cidr-block 10.0.1.0/24 --availability-zone ca-central-1a"}
+- "How do I create a VPC?" → needs aws-api:suggest_aws_commands with {"query": "create a new VPC"}
+- "Create IAM role with permissions" → needs aws-api:suggest_aws_commands with {"query": "create IAM role with specific permissions"}
+- "Search for Lambda docs" → needs aws-docs:search_documentation with {"search_phrase": "Lambda", "limit": 5}
+
+"""
+
+
+# User-facing messages keyed by AWS error code, or by exception class name for
+# errors botocore raises before any request is made
+_ERROR_MESSAGES = {
+    "NoCredentialsError": """Je suis désolé, il y a un problème avec les identifiants AWS. 
+
+Veuillez configurer vos identifiants AWS :
+1. Utilisez `aws configure` pour configurer vos identifiants
+2. Ou définissez les variables d'environnement AWS_ACCESS_KEY_ID et AWS_SECRET_ACCESS_KEY
+3. Ou utilisez un profil AWS avec `export AWS_PROFILE=votre-profil`
+
+Une fois configuré, redémarrez l'application.""",
+    "ValidationException": "Je suis désolé, il y a eu un problème avec la validation de la requête. Veuillez réessayer.",
+    "ThrottlingException": "Je suis désolé, il y a eu trop de requêtes. Veuillez attendre un moment et réessayer.",
+}
+
+_EVENT_LOOP_MESSAGE = """Je suis désolé, il y a eu un problème technique avec les boucles d'événements asynchrones. 
+
+Cela peut être résolu en redémarrant l'application. Veuillez :
+1. Arrêter l'application (Ctrl+C)
+2. Redémarrer avec ./run.sh
+
+Si le problème persiste, il pourrait y avoir un conflit dans l'environnement d'exécution."""
 
 class SimpleAgent:
     """
@@ -26,6 +174,8 @@ class SimpleAgent:
         self.conversation_history = []
         self._initialized = False
         self._last_tool_calls = []  # For debug tracking
+        self._intent_prompt_cache = None  # (tools_version, system blocks)
+        self._history_summary = None  # Bedrock summary of evicted exchanges
         
     async def initialize(self):
         """Initialize the agent."""
@@ -36,26 +186,27 @@ class SimpleAgent:
         
         # Initialize Bedrock client
         try:
-            self.bedrock_client = self.aws_session.client(
-                'bedrock-runtime',
-                region_name=self.app_config.aws_region
-            )
+            # Agents on the same profile share one client and its connection pool
+            self.bedrock_client = _get_bedrock_client(self.aws_session, self.app_config.aws_region)
             
-            # Test AWS credentials by making a simple call
-            try:
-                # Test with a simple STS call to verify credentials
-                sts_client = self.aws_session.client('sts')
-                identity = sts_client.get_caller_identity()
-                logger.info(f"AWS credentials verified for: {identity.get('Arn', 'Unknown')}")
-            except Exception as e:
-                logger.warning(f"AWS credentials issue: {e}")
+            # Test AWS credentials by making a simple call. Off by default: the SSO
+            # login already checked this identity, and it costs a round trip
+            if self.app_config.verify_credentials:
+                try:
+                    # Test with a simple STS call to verify credentials
+                    sts_client = self.aws_session.client('sts', config=BOTO_CLIENT_CONFIG)
+                    identity = await asyncio.to_thread(sts_client.get_caller_identity)
+                    logger.info(f"AWS credentials verified for: {identity.get('Arn', 'Unknown')}")
+                except Exception as e:
+                    logger.warning(f"AWS credentials issue: {e}")
                 
         except Exception as e:
             logger.error(f"Failed to initialize Bedrock client: {e}")
             raise
         
-        # Initialize MCP client (synchronous since isolated client handles async internally)
-        self.mcp_client.initialize()
+        # Initialize MCP client (synchronous since isolated client handles async
+        # internally); it blocks until the servers start, so run it off this loop
+        await asyncio.to_thread(self.mcp_client.initialize)
         
         self._initialized = True
         logger.info("Simple Agent initialized successfully")
@@ -77,94 +228,10 @@ class SimpleAgent:
             # Step 1: Analyze user intent and determine if tools are needed
             logger.info("Step 1: Analyzing user intent...")
             intent_analysis = await self._analyze_intent(user_message)
-            logger.info(f"Intent analysis result: {intent_analysis}")
+            logger.debug("Intent analysis result: %s", intent_analysis)
             
             # Step 2: If tools are needed, execute them
-            tool_results = []
-            if intent_analysis.get("needs_tools", False):
-                tool_calls = intent_analysis.get("tool_calls", [])
-                logger.info(f"🛠️ Step 2: Executing {len(tool_calls)} tool calls...")
-                
-                for i, tool_call in enumerate(tool_calls, 1):
-                    logger.info(f"🔧 Tool call {i}/{len(tool_calls)}: {tool_call['name']}")
-                    logger.info(f"📋 Original arguments: {tool_call.get('arguments', {})}")
-                    
-                    # Store tool call for debug
-                    self._last_tool_calls.append({
-                        "name": tool_call['name'],
-                        "arguments": tool_call.get('arguments', {})
-                    })
-                    
-                    try:
-                        # Validate and fix arguments
-                        fixed_arguments = self._validate_and_fix_tool_arguments(
-                            tool_call["name"], 
-                            tool_call.get("arguments", {})
-                        )
-                        logger.info(f"✅ Fixed arguments: {fixed_arguments}")
-                        
-                        # Use synchronous call since isolated client handles async internally
-                        result = self.mcp_client.call_tool(
-                            tool_call["name"], 
-                            fixed_arguments
-                        )
-                        
-                        # Check if the result contains an error
-                        if "error" in result:
-                            logger.warning(f"⚠️ Tool call {i} returned error: {result['error']}")
-                            
-                            # For AWS CLI validation errors, suggest using suggest_aws_commands instead
-                            if "validation" in result["error"].lower() or "parameters" in result["error"].lower():
-                                logger.info(f"🔄 AWS CLI validation error detected, will suggest using suggest_aws_commands")
-                                
-                                # Extract the original intent for suggestion
-                                if tool_call["name"] == "aws-api:call_aws" and "cli_command" in fixed_arguments:
-                                    original_command = fixed_arguments["cli_command"]
-                                    # Convert to a query for suggestions
-                                    query = user_message  # Use original user message as query
-                                    
-                                    logger.info(f"🔄 Trying suggest_aws_commands with query: {query}")
-                                    suggestion_result = self.mcp_client.call_tool(
-                                        "aws-api:suggest_aws_commands",
-                                        {"query": query}
-                                    )
-                                    
-                                    if "result" in suggestion_result:
-                                        logger.info(f"✅ Got command suggestions successfully")
-                                        tool_results.append({
-                                            "tool": "aws-api:suggest_aws_commands",
-                                            "result": suggestion_result,
-                                            "fallback_reason": f"Original command failed validation: {result['error']}"
-                                        })
-                                    else:
-                                        tool_results.append({
-                                            "tool": tool_call["name"],
-                                            "result": result
-                                        })
-                                else:
-                                    tool_results.append({
-                                        "tool": tool_call["name"],
-                                        "result": result
-                                    })
-                            else:
-                                tool_results.append({
-                                    "tool": tool_call["name"],
-                                    "result": result
-                                })
-                        else:
-                            logger.info(f"✅ Tool call {i} completed successfully")
-                            tool_results.append({
-                                "tool": tool_call["name"],
-                                "result": result
-                            })
-                    except Exception as e:
-                        logger.error(f"❌ Tool call {i} failed: {e}")
-                        tool_results.append({
-                            "tool": tool_call["name"],
-                            "result": {"error": str(e)}
-                        })
-            else:
-                logger.info("🚫 No tools needed for this request")
+            tool_results = await self._execute_tools(user_message, intent_analysis)
             
             # Step 3: Generate final response using Bedrock
             logger.info("🤖 Step 3: Generating final response with Bedrock...")
@@ -176,143 +243,262 @@ class SimpleAgent:
             logger.info(f"✅ Final response generated ({len(final_response)} chars)")
             
             # Step 4: Update conversation history
-            self.conversation_history.append({
-                "user": user_message,
-                "assistant": final_response,
-                "tools_used": [tr["tool"] for tr in tool_results]
-            })
-            logger.info(f"📚 Conversation history updated (total: {len(self.conversation_history)} messages)")
+            await self._summarize_evicted(self._remember(user_message, final_response, tool_results))
             
             return final_response
             
         except Exception as e:
-            logger.error(f"💥 Error processing message: {e}")
-            import traceback
-            logger.error(f"📋 Full traceback: {traceback.format_exc()}")
-            
-            # Provide helpful error messages based on the error type
-            if "Unable to locate credentials" in str(e):
-                return """Je suis désolé, il y a un problème avec les identifiants AWS. 
+            logger.exception("💥 Error processing message: %s", e)
+            return self._error_message(e)
 
-Veuillez configurer vos identifiants AWS :
-1. Utilisez `aws configure` pour configurer vos identifiants
-2. Ou définissez les variables d'environnement AWS_ACCESS_KEY_ID et AWS_SECRET_ACCESS_KEY
-3. Ou utilisez un profil AWS avec `export AWS_PROFILE=votre-profil`
+    async def process_message_stream(self, user_message: str) -> AsyncIterator[str]:
+        """
+        Process a user message and yield the final response as it is generated.
+        Intent analysis and tool calls run as in process_message; only the
+        final Bedrock completion is streamed.
+        """
+        if not self._initialized:
+            await self.initialize()
 
-Une fois configuré, redémarrez l'application."""
+        logger.info(f"🎯 Processing user message (streaming): '{user_message}'")
+
+        # Clear previous debug info
+        self._last_tool_calls = []
+
+        chunks = []
+        try:
+            logger.info("Step 1: Analyzing user intent...")
+            intent_analysis = await self._analyze_intent(user_message)
+            logger.debug("Intent analysis result: %s", intent_analysis)
+
+            tool_results = await self._execute_tools(user_message, intent_analysis)
+
+            logger.info("🤖 Step 3: Streaming final response from Bedrock...")
+            system_prompt, prompt = self._build_response_prompt(user_message, tool_results)
+            history = self._format_recent_history()
+            async for chunk in self._stream_bedrock(prompt, max_tokens=1000, history=history, system=system_prompt):
+                chunks.append(chunk)
+                yield chunk
+
+            final_response = "".join(chunks).strip()
+            await self._summarize_evicted(self._remember(user_message, final_response, tool_results))
+
+        except Exception as e:
+            logger.exception("💥 Error processing message: %s", e)
+            yield ("\n\n" if chunks else "") + self._error_message(e)
+
+    def _remember(self, user_message: str, response: str,
+                  tool_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Record an exchange, keeping the last memory_k exchanges within the history budget.
+        
+        Returns:
+            The oldest exchanges dropped from the window, oldest first
+        """
+        history = self.conversation_history
+        history.append({
+            "user": user_message,
+            "assistant": response,
+            # Names parsed from each intent response are fresh strings; intern them
+            # so the retained exchanges share one copy per tool
+            "tools_used": tuple(sys.intern(tr["tool"]) for tr in tool_results)
+        })
+        keep = min(len(history), max(1, self.app_config.memory_k))
+        size = sum(len(h["user"]) + len(h["assistant"]) for h in history[-keep:])
+        # Replaying history costs its full size every turn, so also cap it in chars
+        while keep > 1 and size > self.app_config.history_char_budget:
+            oldest = history[-keep]
+            size -= len(oldest["user"]) + len(oldest["assistant"])
+            keep -= 1
+        evicted = history[:-keep]
+        del history[:-keep]
+        logger.info(f"📚 Conversation history updated (total: {len(history)} messages)")
+        return evicted
+        
+    async def _summarize_evicted(self, evicted: List[Dict[str, Any]]):
+        """Fold exchanges dropped from the window into the running history summary."""
+        if not evicted or not self.app_config.summarize_history:
+            return
+        
+        exchanges = "\n".join(f"User: {h['user']}\nAssistant: {h['assistant']}" for h in evicted)
+        if self._history_summary:
+            exchanges = f"Earlier summary:\n{self._history_summary}\n\n{exchanges}"
+        try:
+            summary = await self._call_bedrock(
+                "Summarize these exchanges in 5 bullet points. Keep resource IDs, regions "
+                f"and decisions:\n{exchanges}",
+                max_tokens=300
+            )
+            self._history_summary = summary.strip() or self._history_summary
+            logger.info(f"📝 Summarized {len(evicted)} older exchanges ({len(self._history_summary or '')} chars)")
+        except Exception as e:
+            logger.warning(f"⚠️ History summary failed, older exchanges dropped: {e}")
+        
+    def _format_recent_history(self) -> List[Dict[str, str]]:
+        """Format the retained exchanges as alternating Bedrock user/assistant messages."""
+        messages = []
+        if self._history_summary:
+            # One synthetic turn, so the cached system prompt stays unchanged
+            messages.append({"role": "user", "content": f"Summary of our earlier conversation:\n{self._history_summary}"})
+            messages.append({"role": "assistant", "content": "Compris."})
+        for exchange in self.conversation_history:
+            if not exchange["assistant"]:
+                continue  # Bedrock rejects empty assistant turns
+            messages.append({"role": "user", "content": exchange["user"]})
+            messages.append({"role": "assistant", "content": exchange["assistant"]})
+        return messages
+        
+    async def _execute_tools(self, user_message: str, intent_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Execute the tool calls requested by the intent analysis and collect their results."""
+        tool_results = []
+        if intent_analysis.get("needs_tools", False):
+            tool_calls = intent_analysis.get("tool_calls", [])
+            logger.info(f"🛠️ Step 2: Executing {len(tool_calls)} tool calls...")
             
-            elif "ValidationException" in str(e):
-                return "Je suis désolé, il y a eu un problème avec la validation de la requête. Veuillez réessayer."
+            # Store tool calls for debug, in the order they were requested
+            for tool_call in tool_calls:
+                self._last_tool_calls.append({
+                    "name": tool_call['name'],
+                    "arguments": tool_call.get('arguments', {})
+                })
+                
+            # Tool calls are independent, so run them concurrently; gather keeps their order
+            results = await asyncio.gather(
+                *(self._execute_tool(user_message, tool_call, i, len(tool_calls))
+                  for i, tool_call in enumerate(tool_calls, 1)),
+                return_exceptions=True
+            )
             
-            elif "ThrottlingException" in str(e):
-                return "Je suis désolé, il y a eu trop de requêtes. Veuillez attendre un moment et réessayer."
+            for i, (tool_call, outcome) in enumerate(zip(tool_calls, results), 1):
+                if isinstance(outcome, Exception):
+                    logger.error(f"❌ Tool call {i} failed: {outcome}")
+                    outcome = {
+                        "tool": tool_call["name"],
+                        "result": {"error": str(outcome)}
+                    }
+                tool_results.append(outcome)
+        else:
+            logger.info("🚫 No tools needed for this request")
+        return tool_results
+        
+    async def _execute_tool(self, user_message: str, tool_call: Dict[str, Any], i: int, total: int) -> Dict[str, Any]:
+        """Run one tool call, falling back to suggest_aws_commands on CLI validation errors."""
+        logger.info(f"🔧 Tool call {i}/{total}: {tool_call['name']}")
+        logger.debug("📋 Original arguments: %s", tool_call.get('arguments', {}))
+        
+        # Validate and fix arguments
+        fixed_arguments = self._validate_and_fix_tool_arguments(
+            tool_call["name"], 
+            tool_call.get("arguments", {})
+        )
+        logger.debug("✅ Fixed arguments: %s", fixed_arguments)
+        
+        # The isolated client blocks on its own loop, so keep it off this one
+        result = await asyncio.to_thread(
+            self.mcp_client.call_tool,
+            tool_call["name"], 
+            fixed_arguments
+        )
+        
+        # Check if the result contains an error
+        if "error" not in result:
+            logger.info(f"✅ Tool call {i} completed successfully")
+            return {"tool": tool_call["name"], "result": result}
             
-            elif "event loop" in str(e).lower() or "asyncio" in str(e).lower():
-                return """Je suis désolé, il y a eu un problème technique avec les boucles d'événements asynchrones. 
-
-Cela peut être résolu en redémarrant l'application. Veuillez :
-1. Arrêter l'application (Ctrl+C)
-2. Redémarrer avec ./run.sh
-
-Si le problème persiste, il pourrait y avoir un conflit dans l'environnement d'exécution."""
+        logger.warning(f"⚠️ Tool call {i} returned error: {result['error']}")
+        
+        # For AWS CLI validation errors, suggest using suggest_aws_commands instead
+        error = result["error"].lower()
+        if ("validation" in error or "parameters" in error) and \
+                tool_call["name"] == "aws-api:call_aws" and "cli_command" in fixed_arguments:
+            # Use original user message as query for suggestions
+            logger.info(f"🔄 AWS CLI validation error detected, trying suggest_aws_commands with query: {user_message}")
+            suggestion_result = await asyncio.to_thread(
+                self.mcp_client.call_tool,
+                "aws-api:suggest_aws_commands",
+                {"query": user_message}
+            )
             
-            else:
-                return f"Je suis désolé, une erreur s'est produite: {str(e)}"
+            if "result" in suggestion_result:
+                logger.info(f"✅ Got command suggestions successfully")
+                return {
+                    "tool": "aws-api:suggest_aws_commands",
+                    "result": suggestion_result,
+                    "fallback_reason": f"Original command failed validation: {result['error']}"
+                }
+                
+        return {"tool": tool_call["name"], "result": result}
+        
+    def _error_message(self, e: Exception) -> str:
+        """Map a processing error to a user-facing message."""
+        if isinstance(e, ClientError):
+            code = e.response.get("Error", {}).get("Code", "")
+        else:
+            code = type(e).__name__
+        message = _ERROR_MESSAGES.get(code)
+        if message:
+            return message
+        
+        text = str(e)
+        if isinstance(e, RuntimeError) and ("event loop" in text.lower() or "asyncio" in text.lower()):
+            return _EVENT_LOOP_MESSAGE
+        return f"Je suis désolé, une erreur s'est produite: {text}"
+        
+    def _fast_intent(self, user_message: str) -> Optional[Dict[str, Any]]:
+        """Map an obvious read-only request straight to a call_aws tool call, or return None."""
+        if "aws-api:call_aws" not in self.mcp_client.tools:
+            return None
             
+        text = user_message.strip().rstrip("?.! ")
+        for pattern, cli_command in _FAST_INTENTS:
+            match = pattern.fullmatch(text)
+            if match:
+                region = match.groupdict().get("region")
+                if region:
+                    cli_command = f"{cli_command} --region {region.lower()}"
+                return {
+                    "needs_tools": True,
+                    "reasoning": "Matched a common read-only request",
+                    "tool_calls": [{"name": "aws-api:call_aws", "arguments": {"cli_command": cli_command}}]
+                }
+        return None
+        
     async def _analyze_intent(self, user_message: str) -> Dict[str, Any]:
         """Analyze user intent and determine what tools to use."""
         
         logger.info(f"[INTENT] Starting intent analysis for: '{user_message}'")
         
-        # Get available tools
-        available_tools = self.mcp_client.get_available_tools()
-        tools_description = self._format_tools_for_prompt(available_tools)
-        
-        logger.info(f"[INTENT] Available tools count: {len(available_tools)}")
+        fast_intent = self._fast_intent(user_message)
+        if fast_intent:
+            logger.info("⚡ [INTENT] Matched a common request, skipping Bedrock intent analysis")
+            return fast_intent
+            
+        logger.info(f"[INTENT] Available tools count: {len(self.mcp_client.tools)}")
         
-        # Create intent analysis prompt with improved context awareness
-        prompt = f"""Analyze this user request and determine if AWS tools are needed.
-
-User request: "{user_message}"
-
-CONVERSATION CONTEXT: You are having an ongoing conversation about AWS infrastructure. Consider previous context when making decisions.
-
-Available tools:
-{tools_description}
-
-IMPROVED DECISION MAKING:
-1. PREFER call_aws when you know the exact command needed
-2. Use suggest_aws_commands only when truly uncertain
-3. For common operations (create/delete/list), use call_aws directly
-4. Remember context from previous messages (VPC IDs, resource names, etc.)
-
-CONTEXT-AWARE EXAMPLES:
-- If user mentioned a VPC ID earlier, use it in subsequent commands
-- If creating subnets, include --vpc-id parameter
-- If user asks for "the same region", use ca-central-1
-- For availability zones, use ca-central-1a, ca-central-1b, ca-central-1d
-
-COMMON AWS OPERATIONS - USE call_aws DIRECTLY:
-- Create subnet: aws ec2 create-subnet --vpc-id <vpc-id> --cidr-block <cidr> --availability-zone <az>
-- Delete VPC: aws ec2 delete-vpc --vpc-id <vpc-id>
-- List instances: aws ec2 describe-instances
-- List S3 buckets: aws s3 ls
-- Create IAM role: Use suggest_aws_commands (complex multi-step)
-
-IMPORTANT - Use these EXACT parameter names:
-- For aws-api:call_aws → use "cli_command" (not "command")
-- For aws-api:suggest_aws_commands → use "query" (not "command")
-- For aws-docs:read_documentation → use "url", "max_length", "start_index"
-- For aws-docs:search_documentation → use "search_phrase", "limit"
-- For aws-docs:recommend → use "url"
-
-CRITICAL AWS CLI RULES:
-- For IAM role creation: Use ONLY aws iam create-role with --role-name and --assume-role-policy-document
-- To attach policies: Use separate aws iam attach-role-policy command
-- DO NOT use --managed-policy-arns with create-role (not supported)
-- For complex operations requiring multiple steps, use suggest_aws_commands instead of call_aws
-
-Examples of CORRECT IAM commands:
-- Create role: aws iam create-role --role-name MyRole --assume-role-policy-document file://trust-policy.json
-- Attach policy: aws iam attach-role-policy --role-name MyRole --policy-arn arn:aws:iam::aws:policy/ReadOnlyAccess
-
-Respond with JSON only:
-{{
-    "needs_tools": true/false,
-    "reasoning": "explanation of why tools are/aren't needed and which tool is most appropriate",
-    "tool_calls": [
-        {{
-            "name": "server_name:tool_name",
-            "arguments": {{"correct_parameter_name": "value"}}
-        }}
-    ]
-}}
-
-IMPROVED EXAMPLES:
-- "List my S3 buckets" → needs aws-api:call_aws with {{"cli_command": "aws s3 ls"}}
-- "Create subnet in ca-central-1a" → needs aws-api:call_aws with {{"cli_command": "aws ec2 create-subnet --vpc-id <vpc-id> --cidr-block 10.0.1.0/24 --availability-zone ca-central-1a"}}
-- "How do I create a VPC?" → needs aws-api:suggest_aws_commands with {{"query": "create a new VPC"}}
-- "Create IAM role with permissions" → needs aws-api:suggest_aws_commands with {{"query": "create IAM role with specific permissions"}}
-- "Search for Lambda docs" → needs aws-docs:search_documentation with {{"search_phrase": "Lambda", "limit": 5}}
+        # The instructions only change with the tool list, so they go in the system
+        # prompt where Bedrock can cache them; the request follows as the user turn
+        system_blocks = self._intent_system_blocks()
+        prompt = f"""User request: "{user_message}"
 
 JSON response:"""
 
-        logger.info(f"[INTENT] Prompt length: {len(prompt)} chars")
+        logger.info(f"[INTENT] Prompt length: {sum(map(len, system_blocks)) + len(prompt)} chars")
         logger.info(f"[INTENT] Calling Bedrock for intent analysis...")
 
         try:
-            response = await self._call_bedrock(prompt, max_tokens=500)
+            response = await self._call_bedrock(prompt, max_tokens=500, system=system_blocks)
             
-            logger.info(f"[INTENT] Raw Bedrock response: {response}")
+            logger.debug("[INTENT] Raw Bedrock response: %s", response)
             
-            # Extract JSON from response
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                logger.info(f"[INTENT] Extracted JSON: {json_str}")
+            # Extract JSON from response: first "{" through last "}", prose around it ignored
+            start, end = response.find('{'), response.rfind('}')
+            if start != -1 and end > start:
+                json_str = response[start:end + 1]
+                logger.debug("[INTENT] Extracted JSON: %s", json_str)
                 
-                parsed_intent = json.loads(json_str)
-                logger.info(f"✅ [INTENT] Parsed intent successfully: {parsed_intent}")
+                parsed_intent = _loads(json_str)
+                logger.info("✅ [INTENT] Parsed intent successfully")
+                logger.debug("[INTENT] Parsed intent: %s", parsed_intent)
                 return parsed_intent
             else:
                 logger.warning(f"⚠️ [INTENT] Could not extract JSON from response")
@@ -322,28 +508,38 @@ JSON response:"""
             logger.error(f"💥 [INTENT] JSON decode error: {e}")
             return {"needs_tools": False, "reasoning": f"JSON parse error: {e}"}
         except Exception as e:
-            logger.error(f"💥 [INTENT] Intent analysis failed: {e}")
-            import traceback
-            logger.error(f"📋 [INTENT] Full traceback: {traceback.format_exc()}")
+            logger.exception("💥 [INTENT] Intent analysis failed: %s", e)
             return {"needs_tools": False, "reasoning": f"Analysis error: {e}"}
             
-    async def _generate_response(self, user_message: str, intent: Dict[str, Any], tool_results: List[Dict[str, Any]]) -> str:
-        """Generate the final response using Bedrock."""
+    def _build_response_prompt(self, user_message: str, tool_results: List[Dict[str, Any]]) -> Tuple[str, str]:
+        """
+        Build the final response prompt from the user request and tool results.
+        
+        Returns:
+            The static system prompt and the per-turn user content
+        """
         
         # Build context
         context_parts = [f"User request: {user_message}"]
         
         if tool_results:
             context_parts.append("Tool results:")
+            limit = self.app_config.max_tool_result_chars
+            seen = set()
             for result in tool_results:
-                context_parts.append(f"- {result['tool']}: {json.dumps(result['result'], indent=2)}")
+                # Compact JSON: indentation only costs prompt tokens
+                text = json.dumps(result['result'], separators=(',', ':'), ensure_ascii=False, default=str)
+                if (result['tool'], text) in seen:
+                    continue  # Identical call and result already in the prompt
+                seen.add((result['tool'], text))
+                if len(text) > limit:
+                    text = f"{text[:limit]}... [truncated {len(text) - limit} chars]"
+                context_parts.append(f"- {result['tool']}: {text}")
         
         context = "\n".join(context_parts)
         
         # Create response prompt
-        prompt = f"""You are an AWS infrastructure assistant. Provide a helpful, clear response to the user.
-
-{context}
+        system_prompt = """You are an AWS infrastructure assistant. Provide a helpful, clear response to the user.
 
 RESPONSE GUIDELINES:
 - Use French for the response (the user is French-speaking)
@@ -364,73 +560,126 @@ EXAMPLES OF GOOD RESPONSES:
 - For successful VPC deletion: "✅ Le VPC vpc-xxx a été supprimé avec succès dans la région ca-central-1."
 - For subnet creation: "Pour créer des sous-réseaux dans ca-central-1a, utilisez: aws ec2 create-subnet --vpc-id vpc-xxx --cidr-block 10.0.1.0/24 --availability-zone ca-central-1a"
 - For errors: "❌ Erreur: [explanation]. Pour résoudre: [solution steps]"
-
-Response:"""
-
+"""
+        return system_prompt, f"{context}\n\nResponse:"
+        
+    async def _generate_response(self, user_message: str, intent: Dict[str, Any], tool_results: List[Dict[str, Any]]) -> str:
+        """Generate the final response using Bedrock."""
+        system_prompt, prompt = self._build_response_prompt(user_message, tool_results)
         try:
-            response = await self._call_bedrock(prompt, max_tokens=1000)
+            response = await self._call_bedrock(
+                prompt, max_tokens=1000, history=self._format_recent_history(), system=system_prompt
+            )
             return response.strip()
         except Exception as e:
             logger.error(f"Response generation failed: {e}")
             return f"Je suis désolé, je n'ai pas pu générer une réponse: {str(e)}"
             
-    async def _call_bedrock(self, prompt: str, max_tokens: int = 1000) -> str:
-        """Call Bedrock to generate a response."""
+    async def _call_bedrock(self, prompt: str, max_tokens: int = 1000,
+                            history: Optional[List[Dict[str, str]]] = None,
+                            system: Union[str, Sequence[str], None] = None) -> str:
+        """Call Bedrock to generate a response, after any prior conversation turns."""
         
         logger.info(f"🤖 [BEDROCK] Calling Bedrock with {len(prompt)} char prompt")
         logger.info(f"🤖 [BEDROCK] Model: {self.app_config.bedrock_model_id}")
         logger.info(f"🤖 [BEDROCK] Max tokens: {max_tokens}")
         logger.info(f"🤖 [BEDROCK] Temperature: {self.app_config.temperature}")
         
-        # Use the correct format for Claude models
-        body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "max_tokens": max_tokens,
-            "temperature": self.app_config.temperature,
-            "top_p": self.app_config.top_p
-        }
-        
-        logger.info(f"🤖 [BEDROCK] Request body: {json.dumps(body, indent=2)}")
+        body = self._request_body(prompt, max_tokens, history, system)
+        logger.debug("🤖 [BEDROCK] Request body: %s", body)
         
         try:
             start_time = time.time()
-            response = self.bedrock_client.invoke_model(
+            response = await asyncio.to_thread(
+                self.bedrock_client.invoke_model,
                 modelId=self.app_config.bedrock_model_id,
-                body=json.dumps(body)
+                body=_dumps(body)
             )
             end_time = time.time()
             
             logger.info(f"🤖 [BEDROCK] Response received in {end_time - start_time:.2f}s")
             
-            response_body = json.loads(response['body'].read())
-            logger.info(f"🤖 [BEDROCK] Response body: {json.dumps(response_body, indent=2)}")
+            response_body = _loads(response['body'].read())
+            logger.debug("🤖 [BEDROCK] Response body: %s", response_body)
             
             if 'content' in response_body and response_body['content']:
                 result = response_body['content'][0]['text']
                 logger.info(f"✅ [BEDROCK] Generated response ({len(result)} chars)")
-                logger.info(f"📋 [BEDROCK] Response preview: {result[:200]}...")
+                logger.debug("📋 [BEDROCK] Response preview: %s...", result[:200])
                 return result
             else:
                 logger.error(f"❌ [BEDROCK] Invalid response format")
                 raise Exception("Invalid response format from Bedrock")
                 
         except Exception as e:
-            logger.error(f"💥 [BEDROCK] Call failed: {e}")
-            import traceback
-            logger.error(f"📋 [BEDROCK] Full traceback: {traceback.format_exc()}")
+            logger.exception("💥 [BEDROCK] Call failed: %s", e)
             raise
             
+    async def _stream_bedrock(self, prompt: str, max_tokens: int = 1000,
+                              history: Optional[List[Dict[str, str]]] = None,
+                              system: Union[str, Sequence[str], None] = None) -> AsyncIterator[str]:
+        """Call Bedrock with a streaming response and yield text deltas as they arrive."""
+        
+        logger.info(f"🤖 [BEDROCK] Streaming Bedrock call with {len(prompt)} char prompt")
+        
+        start_time = time.time()
+        response = await asyncio.to_thread(
+            self.bedrock_client.invoke_model_with_response_stream,
+            modelId=self.app_config.bedrock_model_id,
+            body=_dumps(self._request_body(prompt, max_tokens, history, system))
+        )
+        
+        # The event stream blocks on the socket, so read each event off the loop
+        events = iter(response['body'])
+        first_chunk = True
+        while (event := await asyncio.to_thread(next, events, None)) is not None:
+            if 'chunk' not in event:
+                continue
+            payload = _loads(event['chunk']['bytes'])
+            if payload.get('type') == 'content_block_delta' and payload['delta'].get('type') == 'text_delta':
+                if first_chunk:
+                    logger.info(f"🤖 [BEDROCK] First token after {time.time() - start_time:.2f}s")
+                    first_chunk = False
+                yield payload['delta']['text']
+        
+        logger.info(f"✅ [BEDROCK] Stream completed in {time.time() - start_time:.2f}s")
+        
+    def _request_body(self, prompt: str, max_tokens: int,
+                      history: Optional[List[Dict[str, str]]] = None,
+                      system: Union[str, Sequence[str], None] = None) -> Dict[str, Any]:
+        """Build the Bedrock request body for the configured model."""
+        # Use the correct format for Claude models
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "messages": [
+                *(history or []),
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "max_tokens": max_tokens,
+            "temperature": self.app_config.temperature,
+            "top_p": self.app_config.top_p
+        }
+        if system:
+            blocks = [system] if isinstance(system, str) else list(system)
+            if self.app_config.prompt_caching:
+                # A cache breakpoint after each block: a change to a later block
+                # still reuses the cached prefix before it
+                body["system"] = [
+                    {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+                    for text in blocks
+                ]
+            else:
+                body["system"] = "".join(blocks)
+        return body
+        
     def _validate_and_fix_tool_arguments(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Validate and fix tool arguments based on official MCP server schemas."""
         
         logger.info(f"🔧 [VALIDATE] Validating arguments for tool: {tool_name}")
-        logger.info(f"🔧 [VALIDATE] Original arguments: {json.dumps(arguments, indent=2)}")
+        logger.debug("🔧 [VALIDATE] Original arguments: %s", arguments)
         
         # Get the tool schema
         if tool_name not in self.mcp_client.tools:
@@ -441,70 +690,62 @@ Response:"""
         tool = self.mcp_client.tools[tool_name]
         logger.info(f"✅ [VALIDATE] Found tool schema for {tool_name}")
         
+        # Most calls need no fix: hand back the caller's dict without copying it
+        aliases = _ARG_ALIASES.get(tool_name, {})
+        needs_rename = any(wrong in arguments and right not in arguments for wrong, right in aliases.items())
+        has_unknown = tool.properties is not None and any(p not in tool.properties for p in arguments)
+        if not (needs_rename or has_unknown):
+            missing_params = sorted(tool.required - arguments.keys())
+            if missing_params:
+                logger.warning(f"⚠️ [VALIDATE] Missing required parameters: {missing_params}")
+            logger.info(f"✅ [VALIDATE] No fixes needed - arguments already correct")
+            return arguments
+            
         # Common argument fixes based on official AWS Labs MCP servers
         fixed_arguments = arguments.copy()
         fixes_applied = []
         
-        if tool_name == "aws-api:call_aws":
-            # Fix: command → cli_command
-            if "command" in fixed_arguments and "cli_command" not in fixed_arguments:
-                fixed_arguments["cli_command"] = fixed_arguments.pop("command")
-                fixes_applied.append("command → cli_command")
-                
-        elif tool_name == "aws-api:suggest_aws_commands":
-            # Fix: command → query
-            if "command" in fixed_arguments and "query" not in fixed_arguments:
-                fixed_arguments["query"] = fixed_arguments.pop("command")
-                fixes_applied.append("command → query")
-                
-        elif tool_name == "aws-docs:search_documentation":
-            # Fix: search → search_phrase
-            if "search" in fixed_arguments and "search_phrase" not in fixed_arguments:
-                fixed_arguments["search_phrase"] = fixed_arguments.pop("search")
-                fixes_applied.append("search → search_phrase")
+        for wrong, right in aliases.items():
+            if wrong in fixed_arguments and right not in fixed_arguments:
+                fixed_arguments[right] = fixed_arguments.pop(wrong)
+                fixes_applied.append(f"{wrong} → {right}")
                 
         if fixes_applied:
             logger.info(f"🔧 [VALIDATE] Applied fixes: {', '.join(fixes_applied)}")
         else:
             logger.info(f"✅ [VALIDATE] No fixes needed - arguments already correct")
                 
-        # Validate against schema if available
-        if hasattr(tool, 'input_schema') and tool.input_schema:
-            schema = tool.input_schema
-            logger.info(f"📋 [VALIDATE] Tool schema: {json.dumps(schema, indent=2)}")
+        # Validate against the parameter names indexed from the schema
+        if tool.properties is not None:
+            logger.debug("📋 [VALIDATE] Tool schema: %s", tool.input_schema)
             
-            if 'properties' in schema:
-                required_params = schema.get('required', [])
-                available_params = list(schema['properties'].keys())
-                
-                logger.info(f"📋 [VALIDATE] Required params: {required_params}")
-                logger.info(f"📋 [VALIDATE] Available params: {available_params}")
+            # Check for missing required parameters
+            missing_params = sorted(tool.required - fixed_arguments.keys())
+            if missing_params:
+                logger.warning(f"⚠️ [VALIDATE] Missing required parameters: {missing_params}")
+            else:
+                logger.info(f"✅ [VALIDATE] All required parameters present")
                 
-                # Check for missing required parameters
-                missing_params = []
-                for param in required_params:
-                    if param not in fixed_arguments:
-                        missing_params.append(param)
-                        
-                if missing_params:
-                    logger.warning(f"⚠️ [VALIDATE] Missing required parameters: {missing_params}")
-                else:
-                    logger.info(f"✅ [VALIDATE] All required parameters present")
-                        
-                # Remove unknown parameters
-                unknown_params = [p for p in fixed_arguments.keys() if p not in available_params]
-                for param in unknown_params:
-                    logger.warning(f"⚠️ [VALIDATE] Removing unknown parameter: {param}")
-                    fixed_arguments.pop(param)
-                    
-                if unknown_params:
-                    logger.info(f"🔧 [VALIDATE] Removed unknown parameters: {unknown_params}")
+            # Remove unknown parameters
+            unknown_params = [p for p in fixed_arguments if p not in tool.properties]
+            for param in unknown_params:
+                logger.warning(f"⚠️ [VALIDATE] Removing unknown parameter: {param}")
+                fixed_arguments.pop(param)
         else:
             logger.info(f"📋 [VALIDATE] No schema available for validation")
                     
-        logger.info(f"✅ [VALIDATE] Final arguments: {json.dumps(fixed_arguments, indent=2)}")
+        logger.debug("✅ [VALIDATE] Final arguments: %s", fixed_arguments)
         return fixed_arguments
         
+    def _intent_system_blocks(self) -> Tuple[str, str]:
+        """Get the intent instructions and tool list, rebuilt only when the tool list changes."""
+        version = self.mcp_client.tools_version
+        if self._intent_prompt_cache is None or self._intent_prompt_cache[0] != version:
+            tools_description = self._format_tools_for_prompt(self.mcp_client.get_available_tools())
+            blocks = (_INTENT_SYSTEM_PROMPT, f"Available tools:\n{tools_description}")
+            self._intent_prompt_cache = (version, blocks)
+        return self._intent_prompt_cache[1]
+        
     def _format_tools_for_prompt(self, tools: List[Dict[str, Any]]) -> str:
         """Format tools for inclusion in prompts."""
         if not tools:
@@ -519,9 +760,10 @@ Response:"""
     def clear_history(self):
         """Clear conversation history."""
         self.conversation_history.clear()
+        self._history_summary = None
         logger.info("Conversation history cleared")
         
     async def cleanup(self):
         """Clean up resources."""
-        self.mcp_client.cleanup()  # Synchronous cleanup
+        await asyncio.to_thread(self.mcp_client.cleanup)  # Blocks on the client's own loop
         logger.info("Simple Agent cleanup completed")
@@ -4,9 +4,10 @@ Async handler for Streamlit to avoid event loop conflicts
 
 import asyncio
 import concurrent.futures
+import contextlib
 import logging
 import threading
-from typing import Any, Coroutine
+from typing import Any, AsyncIterator, Coroutine, Iterator
 
 logger = logging.getLogger(__name__)
 
@@ -14,33 +15,42 @@ logger = logging.getLogger(__name__)
 class StreamlitAsyncHandler:
     """
     Handles async operations in Streamlit to avoid event loop conflicts.
+    
+    Coroutines run on one long-lived event loop in a background thread, shared
+    by every call, so no loop or worker thread is set up per request.
     """
     
     def __init__(self):
-        self._executor = None
         self._loop = None
+        self._loop_thread = None
+        self._lock = threading.Lock()
         
-    def _get_executor(self):
-        """Get or create a thread pool executor."""
-        if self._executor is None:
-            self._executor = concurrent.futures.ThreadPoolExecutor(
-                max_workers=2,
-                thread_name_prefix="streamlit-async"
-            )
-        return self._executor
-        
-    def _run_in_new_loop(self, coro: Coroutine) -> Any:
-        """Run a coroutine in a new event loop in a separate thread."""
-        def run_coro():
-            # Create a new event loop for this thread
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                return loop.run_until_complete(coro)
-            finally:
-                loop.close()
-                
-        return run_coro()
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the background event loop, starting it on first use."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            return loop  # Started already; skip the lock
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="streamlit-async",
+                    daemon=True
+                )
+                self._loop_thread.start()
+                logger.info("🔄 Started background async event loop")
+            return self._loop
+            
+    def _submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Schedule a coroutine on the background loop."""
+        loop = self._get_loop()
+        # Only the loop's own thread can deadlock on it; a thread check avoids
+        # the exception get_running_loop() raises on every Streamlit call
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError("Cannot block on the async handler loop from inside it")
+        return asyncio.run_coroutine_threadsafe(coro, loop)
         
     def run_async(self, coro: Coroutine, timeout: int = 60) -> Any:
         """
@@ -55,51 +65,113 @@ class StreamlitAsyncHandler:
         """
         logger.info(f"🔄 Running async operation with timeout: {timeout}s")
         
+        future = self._submit(coro)
         try:
-            # Check if there's already an event loop running
-            try:
-                current_loop = asyncio.get_running_loop()
-                if current_loop.is_running():
-                    logger.info("🔍 Detected existing event loop, using ThreadPoolExecutor")
-                    
-                    # Use ThreadPoolExecutor to run in a separate thread with new loop
-                    executor = self._get_executor()
-                    future = executor.submit(self._run_in_new_loop, coro)
-                    result = future.result(timeout=timeout)
-                    
-                    logger.info("✅ Async operation completed successfully")
-                    return result
-                else:
-                    # Loop exists but not running, safe to use asyncio.run
-                    logger.info("🔍 Event loop exists but not running, using asyncio.run")
-                    result = asyncio.run(coro)
-                    logger.info("✅ Async operation completed successfully")
-                    return result
-                    
-            except RuntimeError as e:
-                if "no running event loop" in str(e).lower():
-                    # No event loop running, safe to use asyncio.run
-                    logger.info("🔍 No existing event loop, using asyncio.run")
-                    result = asyncio.run(coro)
-                    logger.info("✅ Async operation completed successfully")
-                    return result
-                else:
-                    # Other RuntimeError, re-raise
-                    raise
-                
+            result = future.result(timeout=timeout)
+            logger.info("✅ Async operation completed successfully")
+            return result
         except concurrent.futures.TimeoutError:
+            future.cancel()
             logger.error(f"⏰ Async operation timed out after {timeout}s")
             raise TimeoutError(f"Operation timed out after {timeout} seconds")
         except Exception as e:
             logger.error(f"💥 Async operation failed: {e}")
             raise
             
+    def iter_async(self, agen: AsyncIterator[Any], timeout: int = 120) -> Iterator[Any]:
+        """
+        Drive an async generator from synchronous Streamlit code.
+        
+        Items are pulled one at a time on the background loop, so the
+        generator keeps its loop-bound state between chunks.
+        
+        Args:
+            agen: The async generator to consume
+            timeout: Timeout in seconds for each item
+            
+        Yields:
+            Items produced by the async generator
+        """
+        logger.info(f"🔄 Streaming async operation with timeout: {timeout}s per item")
+        
+        try:
+            while True:
+                future = self._submit(agen.__anext__())
+                try:
+                    item = future.result(timeout=timeout)
+                except StopAsyncIteration:
+                    break
+                except concurrent.futures.TimeoutError:
+                    future.cancel()
+                    logger.error(f"⏰ Async stream timed out after {timeout}s")
+                    raise TimeoutError(f"Operation timed out after {timeout} seconds")
+                yield item
+            logger.info("✅ Async stream completed successfully")
+        finally:
+            try:
+                self._submit(agen.aclose()).result(timeout=5)
+            except Exception as e:
+                logger.debug(f"Async stream close failed: {e}")
+                
     def cleanup(self):
         """Clean up resources."""
-        if self._executor:
-            logger.info("🧹 Cleaning up async handler")
-            self._executor.shutdown(wait=True)
-            self._executor = None
+        with self._lock:
+            if self._loop and not self._loop.is_closed():
+                logger.info("🧹 Cleaning up async handler")
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                if self._loop_thread:
+                    self._loop_thread.join(timeout=5)
+                self._loop.close()
+            self._loop = None
+            self._loop_thread = None
+
+
+class AdmissionGate:
+    """
+    Caps the number of agent requests in flight across Streamlit sessions.
+
+    Sessions run on separate script threads, each with its own event loop,
+    so the gate is a threading.Condition rather than an asyncio primitive.
+    """
+
+    def __init__(self, max_in_flight: int):
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._max = max(1, max_in_flight)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests currently admitted."""
+        return self._in_flight
+
+    def resize(self, max_in_flight: int):
+        """Change the limit and wake waiters that may now be admitted."""
+        with self._cond:
+            self._max = max(1, max_in_flight)
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, timeout: int = 120) -> Iterator[None]:
+        """
+        Hold one request slot for the duration of the block.
+
+        Args:
+            timeout: Seconds to wait for a free slot
+
+        Raises:
+            TimeoutError: If no slot frees up in time
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._in_flight < self._max, timeout=timeout):
+                logger.warning(f"⏰ No request slot free after {timeout}s ({self._in_flight}/{self._max} in flight)")
+                raise TimeoutError(f"Server busy, no request slot free after {timeout} seconds")
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify(1)
 
 
 # Global instance for Streamlit
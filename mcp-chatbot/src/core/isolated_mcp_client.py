@@ -4,19 +4,95 @@ Completely isolates MCP operations in their own event loop to avoid conflicts
 """
 
 import asyncio
+import functools
+import itertools
 import json
 import logging
 import os
-import subprocess
-import time
 import threading
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor
-import queue
+from typing import Dict, FrozenSet, List, Any, Optional, Tuple
+from dataclasses import dataclass, field
+
+try:
+    import orjson
+    # Tool results run to hundreds of KB; orjson parses the raw line bytes directly
+    _dumps, _loads = orjson.dumps, orjson.loads
+except ImportError:  # orjson is optional
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+    _loads = json.loads
 
 logger = logging.getLogger(__name__)
 
+# AWS variables passed from the app's environment to every server
+AWS_ENV_PASSTHROUGH = (
+    "AWS_PROFILE", "AWS_REGION", "AWS_DEFAULT_REGION",
+    "AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"
+)
+
+# Seconds to wait for a server's initialize reply, including its uvx startup.
+# Must stay under the 60s _run_in_loop timeout for the whole initialization
+SERVER_START_TIMEOUT = 30
+
+# Largest JSON-RPC line read from a server. The stream default (64 KiB) is smaller
+# than many AWS describe-* results, which readline() would reject
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+
+@functools.lru_cache(maxsize=1)
+def _find_uvx() -> Optional[str]:
+    """Locate the uvx executable once per process; None if it is not installed."""
+    import shutil
+    uvx_path = shutil.which("uvx")
+    if not uvx_path:
+        for path in ["/opt/homebrew/bin/uvx", "/usr/local/bin/uvx", "/usr/bin/uvx"]:
+            if os.path.exists(path):
+                return path
+    return uvx_path
+
+
+def _aws_home_env() -> Dict[str, str]:
+    """Get the AWS config paths and default-profile keys for server environments."""
+    aws_home = os.path.expanduser("~/.aws")
+    credentials_file = os.path.join(aws_home, "credentials")
+    try:
+        stat = os.stat(credentials_file)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        signature = None
+    return _read_aws_home_env(aws_home, os.path.isdir(aws_home), signature)
+
+
+@functools.lru_cache(maxsize=4)
+def _read_aws_home_env(aws_home: str, exists: bool, signature: Optional[Tuple[int, int]]) -> Dict[str, str]:
+    """Parse ~/.aws once per credentials file version; servers start concurrently."""
+    env: Dict[str, str] = {}
+    if not exists:
+        return env
+    env["AWS_CONFIG_FILE"] = os.path.join(aws_home, "config")
+    env["AWS_SHARED_CREDENTIALS_FILE"] = os.path.join(aws_home, "credentials")
+    logger.info("🔐 [MCP] Set AWS config paths")
+    
+    # Try to read credentials directly from the default profile
+    if signature is None:
+        return env
+    try:
+        import configparser
+        config_parser = configparser.ConfigParser()
+        config_parser.read(env["AWS_SHARED_CREDENTIALS_FILE"])
+        
+        if 'default' in config_parser:
+            default_section = config_parser['default']
+            if 'aws_access_key_id' in default_section:
+                env["AWS_ACCESS_KEY_ID"] = default_section['aws_access_key_id']
+                logger.info(f"🔐 [MCP] Set AWS_ACCESS_KEY_ID from default profile")
+            if 'aws_secret_access_key' in default_section:
+                env["AWS_SECRET_ACCESS_KEY"] = default_section['aws_secret_access_key']
+                logger.info(f"🔐 [MCP] Set AWS_SECRET_ACCESS_KEY from default profile")
+    except Exception as e:
+        logger.warning(f"⚠️ [MCP] Could not read credentials file: {e}")
+    return env
+
 
 @dataclass
 class MCPTool:
@@ -25,6 +101,14 @@ class MCPTool:
     description: str
     input_schema: Dict[str, Any]
     server_name: str
+    # Parameter names indexed once at registration; properties is None without a schema
+    properties: Optional[FrozenSet[str]] = field(init=False, repr=False)
+    required: FrozenSet[str] = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        schema_properties = (self.input_schema or {}).get('properties')
+        self.properties = frozenset(schema_properties) if schema_properties is not None else None
+        self.required = frozenset((self.input_schema or {}).get('required', ()))
 
 
 class IsolatedMCPClient:
@@ -36,11 +120,16 @@ class IsolatedMCPClient:
     def __init__(self, config):
         self.config = config
         self.tools: Dict[str, MCPTool] = {}
+        self._tools_version = 0  # Bumped whenever self.tools changes
+        self._tool_groups_cache: Optional[Tuple[int, Dict[str, List[Tuple[str, MCPTool]]]]] = None
+        self._tools_list_cache: Optional[Tuple[int, List[Dict[str, Any]]]] = None
         self._initialized = False
         self._loop_thread = None
         self._loop = None
-        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mcp-isolated")
         self._server_data = {}  # Store server processes and data
+        self._connected_count = 0  # Servers flagged initialized in _server_data
+        self._init_lock = threading.Lock()  # Client may be shared across Streamlit sessions
+        self._loop_ready = threading.Event()  # Set once the isolated loop is running
         
         # UI compatibility attributes
         self.server_processes = {}  # For UI display compatibility
@@ -50,8 +139,38 @@ class IsolatedMCPClient:
         """Get the number of active servers."""
         return len(self._server_data)
         
+    @property
+    def connected_count(self) -> int:
+        """Get the number of servers that finished initializing."""
+        return self._connected_count
+        
+    @property
+    def tools_version(self) -> int:
+        """Get a counter that changes whenever the tool list changes."""
+        return self._tools_version
+        
+    @property
+    def tool_groups(self) -> Dict[str, List[Tuple[str, MCPTool]]]:
+        """Get tools grouped by server prefix, recomputed only when tools change."""
+        cache = self._tool_groups_cache
+        if cache is None or cache[0] != self._tools_version:
+            groups: Dict[str, List[Tuple[str, MCPTool]]] = {}
+            for tool_name, tool in self.tools.items():
+                server_name = tool_name.split(':')[0] if ':' in tool_name else 'unknown'
+                groups.setdefault(server_name, []).append((tool_name, tool))
+            cache = self._tool_groups_cache = (self._tools_version, groups)
+        return cache[1]
+        
+    @property
+    def tool_counts(self) -> Dict[str, int]:
+        """Get the number of tools per server."""
+        return {server_name: len(tools) for server_name, tools in self.tool_groups.items()}
+        
     def get_server_status(self) -> Dict[str, str]:
-        """Get status of all servers for UI display."""
+        """Get status of all servers for UI display.
+        
+        Reads the flags recorded at initialization; no server is contacted.
+        """
         status = {}
         for server_name, server_data in self._server_data.items():
             if server_data.get('initialized', False):
@@ -63,8 +182,13 @@ class IsolatedMCPClient:
     def _run_event_loop(self):
         """Run the isolated event loop in a separate thread."""
         logger.info("🔄 Starting isolated MCP event loop...")
-        self._loop = asyncio.new_event_loop()
+        try:
+            import uvloop  # Optional: faster subprocess pipe I/O (not on Windows)
+            self._loop = uvloop.new_event_loop()
+        except ImportError:
+            self._loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(self._loop_ready.set)
         
         try:
             self._loop.run_forever()
@@ -96,13 +220,14 @@ class IsolatedMCPClient:
             
         logger.info(f"Found {len(official_servers)} official servers to initialize")
         
-        # Initialize each official server
-        for server_name, server_config in official_servers.items():
-            try:
-                await self._async_initialize_server(server_name, server_config)
-            except Exception as e:
-                logger.error(f"Failed to initialize {server_name}: {e}")
-                continue
+        # Start all servers at once: startup costs the slowest server, not the sum
+        results = await asyncio.gather(
+            *(self._async_initialize_server(name, server) for name, server in official_servers.items()),
+            return_exceptions=True
+        )
+        for server_name, result in zip(official_servers, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to initialize {server_name}: {result}")
                 
         logger.info(f"MCP client initialized with {len(self.tools)} tools")
         
@@ -111,61 +236,18 @@ class IsolatedMCPClient:
         logger.info(f"🔧 Initializing server: {server_name}")
         
         try:
-            # Find uvx path
-            import shutil
-            uvx_path = shutil.which("uvx")
-            if not uvx_path:
-                for path in ["/opt/homebrew/bin/uvx", "/usr/local/bin/uvx", "/usr/bin/uvx"]:
-                    if os.path.exists(path):
-                        uvx_path = path
-                        break
-            
+            uvx_path = _find_uvx()
             if not uvx_path:
+                _find_uvx.cache_clear()  # Look again next time, uvx may get installed
                 raise Exception("uvx command not found")
                 
             cmd = [uvx_path] + server_config.args
             
-            # Set up environment
-            env = os.environ.copy()
-            if server_config.env:
-                env.update(server_config.env)
-                
-            # Ensure AWS configuration is available to the MCP server
-            aws_home = os.path.expanduser("~/.aws")
-            if os.path.exists(aws_home):
-                env["AWS_CONFIG_FILE"] = os.path.join(aws_home, "config")
-                env["AWS_SHARED_CREDENTIALS_FILE"] = os.path.join(aws_home, "credentials")
-                logger.info(f"🔐 [MCP] Set AWS config paths for {server_name}")
-                
-                # Try to read credentials directly from the default profile
-                try:
-                    import configparser
-                    credentials_file = os.path.join(aws_home, "credentials")
-                    if os.path.exists(credentials_file):
-                        config_parser = configparser.ConfigParser()
-                        config_parser.read(credentials_file)
-                        
-                        if 'default' in config_parser:
-                            default_section = config_parser['default']
-                            if 'aws_access_key_id' in default_section:
-                                env["AWS_ACCESS_KEY_ID"] = default_section['aws_access_key_id']
-                                logger.info(f"🔐 [MCP] Set AWS_ACCESS_KEY_ID from default profile")
-                            if 'aws_secret_access_key' in default_section:
-                                env["AWS_SECRET_ACCESS_KEY"] = default_section['aws_secret_access_key']
-                                logger.info(f"🔐 [MCP] Set AWS_SECRET_ACCESS_KEY from default profile")
-                except Exception as e:
-                    logger.warning(f"⚠️ [MCP] Could not read credentials file: {e}")
-                
-            # Also pass through any existing AWS environment variables
-            aws_env_vars = [
-                "AWS_PROFILE", "AWS_REGION", "AWS_DEFAULT_REGION",
-                "AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"
-            ]
-            
-            for var in aws_env_vars:
-                if var in os.environ:
-                    env[var] = os.environ[var]
-                    logger.info(f"🔐 [MCP] Passed AWS env var: {var}")
+            # Set up environment. AWS variables already in the app's environment win
+            # over the config files, matching how the AWS CLI resolves them
+            env = os.environ | (server_config.env or {}) | _aws_home_env()
+            env.update((var, os.environ[var]) for var in AWS_ENV_PASSTHROUGH if var in os.environ)
+            logger.info(f"🔐 [MCP] Prepared AWS environment for {server_name}")
                     
             # Don't set AWS_PROFILE explicitly - let AWS CLI use default resolution
             # This matches how AWS CLI works in the terminal
@@ -193,13 +275,12 @@ class IsolatedMCPClient:
                 stdin=asyncio.subprocess.PIPE,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                env=env
+                env=env,
+                limit=MAX_MESSAGE_BYTES
             )
             
-            # Wait for server to start
-            await asyncio.sleep(3)
-            
-            # Send initialize request
+            # Send initialize request. No fixed wait for startup: it sits in the
+            # pipe until the server reads it, and the reply itself signals ready
             init_request = {
                 "jsonrpc": "2.0",
                 "id": 1,
@@ -215,20 +296,19 @@ class IsolatedMCPClient:
             }
             
             # Send request
-            request_json = json.dumps(init_request) + "\n"
-            process.stdin.write(request_json.encode())
+            process.stdin.write(_dumps(init_request) + b"\n")
             await process.stdin.drain()
             
-            # Read response
+            # Read response; the timeout covers uvx startup too
             response_line = await asyncio.wait_for(
                 process.stdout.readline(), 
-                timeout=15
+                timeout=SERVER_START_TIMEOUT
             )
             
             if not response_line:
                 raise Exception("No response from server")
                 
-            response = json.loads(response_line.decode().strip())
+            response = _loads(response_line)
             
             if "error" in response:
                 raise Exception(f"Server initialization error: {response['error']}")
@@ -241,20 +321,25 @@ class IsolatedMCPClient:
                 "method": "notifications/initialized"
             }
             
-            notification_json = json.dumps(initialized_notification) + "\n"
-            process.stdin.write(notification_json.encode())
-            await process.stdin.drain()
-            
-            await asyncio.sleep(1)
+            # No drain here: the notification goes out in one flush with tools/list.
+            # Both wait for the initialize reply, which MCP requires before requests
+            process.stdin.write(_dumps(initialized_notification) + b"\n")
             
             # Get tools list
             await self._async_get_server_tools(server_name, process)
             
-            # Store server data
+            # Store server data. From here on a reader task owns stdout and routes
+            # each response to its caller by JSON-RPC id, so calls can overlap
+            pending: Dict[int, asyncio.Future] = {}
             self._server_data[server_name] = {
                 'process': process,
-                'initialized': True
+                'initialized': True,
+                'lock': asyncio.Lock(),  # Keeps concurrent request writes whole on stdin
+                'pending': pending,
+                'ids': itertools.count(3),  # 1 and 2 went to the handshake
+                'reader': asyncio.create_task(self._reader_loop(server_name, process, pending))
             }
+            self._connected_count = sum(1 for data in self._server_data.values() if data.get('initialized', False))
             
             # Update UI compatibility attribute
             self.server_processes[server_name] = f"isolated-{server_name}"
@@ -275,8 +360,7 @@ class IsolatedMCPClient:
         }
         
         try:
-            request_json = json.dumps(tools_request) + "\n"
-            process.stdin.write(request_json.encode())
+            process.stdin.write(_dumps(tools_request) + b"\n")
             await process.stdin.drain()
             
             response_line = await asyncio.wait_for(
@@ -288,8 +372,8 @@ class IsolatedMCPClient:
                 logger.warning(f"No tools response from {server_name}")
                 return
                 
-            response = json.loads(response_line.decode().strip())
-            logger.info(f"📋 Tools response from {server_name}: received {len(str(response))} chars")
+            response = _loads(response_line)
+            logger.debug("📋 Tools response from %s: %s", server_name, response)
             
             if "result" in response and "tools" in response["result"]:
                 tools = response["result"]["tools"]
@@ -303,6 +387,7 @@ class IsolatedMCPClient:
                         server_name=server_name
                     )
                     self.tools[f"{server_name}:{tool.name}"] = tool
+                self._tools_version += 1
                     
             elif "error" in response:
                 logger.error(f"❌ Error getting tools from {server_name}: {response['error']}")
@@ -312,10 +397,70 @@ class IsolatedMCPClient:
         except Exception as e:
             logger.warning(f"Failed to get tools from {server_name}: {e}")
             
+    async def _reader_loop(self, server_name: str, process, pending: Dict[int, asyncio.Future]):
+        """Read a server's stdout and resolve the pending call each response belongs to."""
+        try:
+            while True:
+                try:
+                    response_line = await process.stdout.readline()
+                except ValueError:
+                    # Over MAX_MESSAGE_BYTES: the stream drops it, its caller times out
+                    logger.error(f"💥 [MCP] Dropped a message over {MAX_MESSAGE_BYTES} bytes from {server_name}")
+                    continue
+                if not response_line:
+                    break
+                    
+                try:
+                    message = _loads(response_line)
+                except json.JSONDecodeError as e:
+                    logger.error(f"💥 [MCP] JSON decode error from {server_name}: {e}")
+                    logger.error(f"📋 [MCP] Raw response: {response_line}")
+                    continue
+                    
+                future = pending.pop(message.get("id"), None)
+                if future is not None:
+                    if not future.done():
+                        future.set_result(message)
+                elif message.get("method") == "notifications/message":
+                    params = message.get("params") or {}
+                    level, data = params.get("level"), params.get("data", "No details provided")
+                    if level == "error":
+                        logger.error(f"❌ [MCP] Server error notification from {server_name}: {data}")
+                        # Notifications carry no id; attribute one only when a single call is waiting
+                        if len(pending) == 1:
+                            _, future = pending.popitem()
+                            if not future.done():
+                                future.set_result({"error": {"message": self._notification_error(data)}})
+                    else:
+                        logger.info(f"📋 [MCP] Server notification from {server_name} ({level}): {data}")
+                else:
+                    logger.debug("📥 [MCP] Unmatched message from %s: %s", server_name, message)
+        except Exception as e:
+            logger.warning(f"⚠️ [MCP] Reader for {server_name} stopped: {e}")
+        finally:
+            for future in pending.values():
+                if not future.done():
+                    future.set_result({"error": {"message": "No response from server"}})
+            pending.clear()
+            
+    @staticmethod
+    def _notification_error(data: Any) -> str:
+        """Turn an error notification payload into a tool error message."""
+        try:
+            if "validation_failures" in data:
+                error_data = json.loads(data)
+                if "validation_failures" in error_data:
+                    failure = error_data["validation_failures"][0]
+                    reason = failure.get("reason", "Unknown validation error")
+                    return f"AWS CLI validation error: {reason}"
+        except Exception:
+            pass
+        return f"Server error: {data}"
+        
     async def _async_call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Call a tool in the isolated loop."""
         logger.info(f"🔧 [MCP] Calling tool: {tool_name}")
-        logger.info(f"📋 [MCP] Arguments: {json.dumps(arguments, indent=2)}")
+        logger.debug("📋 [MCP] Arguments: %s", arguments)
         
         if tool_name not in self.tools:
             logger.error(f"❌ [MCP] Tool {tool_name} not found in available tools")
@@ -332,12 +477,18 @@ class IsolatedMCPClient:
             logger.info(f"📋 [MCP] Active servers: {list(self._server_data.keys())}")
             return {"error": f"Server {server_name} not available"}
             
-        process = self._server_data[server_name]['process']
+        server_data = self._server_data[server_name]
+        process = server_data['process']
+        pending = server_data['pending']
+        if server_data['reader'].done():
+            logger.error(f"❌ [MCP] Server {server_name} closed its output")
+            return {"error": "No response from server"}
         logger.info(f"✅ [MCP] Found active process for server: {server_name}")
         
+        request_id = next(server_data['ids'])
         tool_request = {
             "jsonrpc": "2.0",
-            "id": int(time.time()),
+            "id": request_id,
             "method": "tools/call",
             "params": {
                 "name": tool.name,
@@ -346,72 +497,19 @@ class IsolatedMCPClient:
         }
         
         logger.info(f"[MCP] Sending tool request to {server_name}:")
-        logger.info(f"[MCP] Request: {json.dumps(tool_request, indent=2)}")
+        logger.debug("[MCP] Request: %s", tool_request)
         
+        future = pending[request_id] = asyncio.get_running_loop().create_future()
         try:
-            request_json = json.dumps(tool_request) + "\n"
-            process.stdin.write(request_json.encode())
-            await process.stdin.drain()
-            
+            request_line = _dumps(tool_request) + b"\n"
+            async with server_data['lock']:
+                process.stdin.write(request_line)
+                await process.stdin.drain()
+                
             logger.info(f"[MCP] Request sent to {server_name}, waiting for response...")
-            
-            response_line = await asyncio.wait_for(
-                process.stdout.readline(), 
-                timeout=30
-            )
-            
-            if not response_line:
-                logger.error(f"❌ [MCP] No response received from {server_name}")
-                return {"error": "No response from server"}
-            
-            response = json.loads(response_line.decode().strip())
+            response = await asyncio.wait_for(future, timeout=30)
             logger.info(f"📥 [MCP] Received response from {server_name}:")
-            logger.info(f"📥 [MCP] Response: {json.dumps(response, indent=2)}")
-            
-            # Handle different response types
-            if "method" in response and response["method"] == "notifications/message":
-                # This is a notification message (often an error)
-                logger.warning(f"⚠️ [MCP] Received notification from {server_name}")
-                
-                if "params" in response and "level" in response["params"]:
-                    level = response["params"]["level"]
-                    data = response["params"].get("data", "No details provided")
-                    
-                    if level == "error":
-                        logger.error(f"❌ [MCP] Server error notification: {data}")
-                        
-                        # Try to extract useful error information
-                        try:
-                            if "validation_failures" in data:
-                                import json as json_lib
-                                error_data = json_lib.loads(data)
-                                if "validation_failures" in error_data:
-                                    failure = error_data["validation_failures"][0]
-                                    reason = failure.get("reason", "Unknown validation error")
-                                    return {"error": f"AWS CLI validation error: {reason}"}
-                        except:
-                            pass
-                            
-                        return {"error": f"Server error: {data}"}
-                    else:
-                        logger.info(f"📋 [MCP] Server notification ({level}): {data}")
-                        return {"error": f"Server notification ({level}): {data}"}
-                        
-                # Wait for the actual response after notification
-                logger.info(f"📥 [MCP] Waiting for actual response after notification...")
-                try:
-                    response_line = await asyncio.wait_for(
-                        process.stdout.readline(), 
-                        timeout=10
-                    )
-                    
-                    if response_line:
-                        response = json.loads(response_line.decode().strip())
-                        logger.info(f"📥 [MCP] Received actual response: {json.dumps(response, indent=2)}")
-                    else:
-                        return {"error": "No response after notification"}
-                except asyncio.TimeoutError:
-                    return {"error": "Timeout waiting for response after notification"}
+            logger.debug("📥 [MCP] Response: %s", response)
             
             # Handle standard JSON-RPC response
             if "error" in response:
@@ -419,75 +517,84 @@ class IsolatedMCPClient:
                 error_message = response["error"].get("message", str(response["error"]))
                 return {"error": error_message}
             elif "result" in response:
-                result_size = len(str(response["result"]))
-                logger.info(f"✅ [MCP] Tool call successful, result size: {result_size} chars")
+                logger.info(f"✅ [MCP] Tool call successful")
                 
-                # Log a preview of the result
-                result_preview = str(response["result"])[:200]
-                logger.info(f"📋 [MCP] Result preview: {result_preview}...")
+                # Log a preview of the result; stringifying a large result is not free
+                if logger.isEnabledFor(logging.DEBUG):
+                    result_text = str(response["result"])
+                    logger.debug("📋 [MCP] Result (%d chars): %s...", len(result_text), result_text[:200])
                 
                 return {"result": response["result"]}
             else:
                 logger.warning(f"⚠️ [MCP] Unexpected response format from {server_name}")
-                logger.info(f"📋 [MCP] Full response: {response}")
+                logger.debug("📋 [MCP] Full response: %s", response)
                 return {"error": "Invalid response format"}
                 
         except asyncio.TimeoutError:
             logger.error(f"⏰ [MCP] Tool call timeout for {tool_name} on {server_name} (30s)")
             return {"error": "Tool call timeout"}
-        except json.JSONDecodeError as e:
-            logger.error(f"💥 [MCP] JSON decode error for {tool_name}: {e}")
-            logger.error(f"📋 [MCP] Raw response: {response_line}")
-            return {"error": f"JSON decode error: {str(e)}"}
         except Exception as e:
-            logger.error(f"💥 [MCP] Tool call exception for {tool_name}: {e}")
-            import traceback
-            logger.error(f"📋 [MCP] Full traceback: {traceback.format_exc()}")
+            logger.exception("💥 [MCP] Tool call exception for %s: %s", tool_name, e)
             return {"error": str(e)}
+        finally:
+            pending.pop(request_id, None)
             
     async def _async_cleanup(self):
         """Clean up servers in the isolated loop."""
         logger.info("🧹 Cleaning up MCP servers...")
         
-        for server_name, server_data in self._server_data.items():
-            try:
-                process = server_data['process']
-                if process.stdin and not process.stdin.is_closing():
-                    process.stdin.close()
-                process.terminate()
-                await asyncio.wait_for(process.wait(), timeout=2)
-                logger.info(f"✅ Cleaned up server: {server_name}")
-            except Exception as e:
-                logger.warning(f"Error cleaning up {server_name}: {e}")
+        # Stop all servers at once, so shutdown waits for the slowest one only
+        await asyncio.gather(*(
+            self._async_stop_server(server_name, server_data)
+            for server_name, server_data in self._server_data.items()
+        ))
                 
         self._server_data.clear()
+        self._connected_count = 0
         self.server_processes.clear()  # Clear UI compatibility attribute
         self.tools.clear()
+        self._tools_version += 1
         
+    async def _async_stop_server(self, server_name: str, server_data: Dict[str, Any]):
+        """Terminate one server process, waiting up to 2 seconds for it to exit."""
+        try:
+            server_data['reader'].cancel()
+            process = server_data['process']
+            if process.stdin and not process.stdin.is_closing():
+                process.stdin.close()
+            process.terminate()
+            await asyncio.wait_for(process.wait(), timeout=2)
+            logger.info(f"✅ Cleaned up server: {server_name}")
+        except Exception as e:
+            logger.warning(f"Error cleaning up {server_name}: {e}")
+            
     # Public interface methods (thread-safe)
     
     def initialize(self):
         """Initialize the MCP client (thread-safe)."""
-        if self._initialized:
-            return
+        with self._init_lock:
+            if self._initialized:
+                return
+                
+            logger.info("🚀 Starting isolated MCP client...")
             
-        logger.info("🚀 Starting isolated MCP client...")
-        
-        # Start the isolated event loop in a separate thread
-        self._loop_thread = threading.Thread(target=self._run_event_loop, daemon=True)
-        self._loop_thread.start()
-        
-        # Wait for loop to start
-        time.sleep(1)
-        
-        # Initialize servers in the isolated loop
-        try:
-            self._run_in_loop(self._async_initialize())
-            self._initialized = True
-            logger.info("✅ Isolated MCP client initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize isolated MCP client: {e}")
-            raise
+            # Start the isolated event loop in a separate thread
+            self._loop_ready.clear()
+            self._loop_thread = threading.Thread(target=self._run_event_loop, daemon=True)
+            self._loop_thread.start()
+            
+            # Wait for loop to start
+            if not self._loop_ready.wait(timeout=5):
+                raise RuntimeError("MCP event loop did not start")
+            
+            # Initialize servers in the isolated loop
+            try:
+                self._run_in_loop(self._async_initialize())
+                self._initialized = True
+                logger.info("✅ Isolated MCP client initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize isolated MCP client: {e}")
+                raise
             
     def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """Call a tool (thread-safe)."""
@@ -501,16 +608,24 @@ class IsolatedMCPClient:
             return {"error": str(e)}
             
     def get_available_tools(self) -> List[Dict[str, Any]]:
-        """Get list of available tools (thread-safe)."""
-        return [
-            {
-                "name": tool.name,
-                "description": tool.description,
-                "input_schema": tool.input_schema,
-                "server_name": tool.server_name
-            }
-            for tool in self.tools.values()
-        ]
+        """Get list of available tools (thread-safe).
+        
+        The list is rebuilt only when the tools change and is shared between
+        callers, so treat it as read-only.
+        """
+        cache = self._tools_list_cache
+        if cache is None or cache[0] != self._tools_version:
+            tools = [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "input_schema": tool.input_schema,
+                    "server_name": tool.server_name
+                }
+                for tool in self.tools.values()
+            ]
+            cache = self._tools_list_cache = (self._tools_version, tools)
+        return cache[1]
         
     def cleanup(self):
         """Clean up resources (thread-safe)."""
@@ -532,9 +647,6 @@ class IsolatedMCPClient:
         # Wait for thread to finish
         if self._loop_thread and self._loop_thread.is_alive():
             self._loop_thread.join(timeout=5)
-            
-        # Shutdown executor
-        self._executor.shutdown(wait=True)
         
         self._initialized = False
         logger.info("✅ Isolated MCP client shutdown complete")
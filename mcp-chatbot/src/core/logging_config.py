@@ -4,9 +4,28 @@ Provides detailed, colorful console output for debugging
 """
 
 import logging
+import re
 import sys
 from typing import Optional
 
+# Colors for the emoji prefixes used in log messages
+PREFIX_COLORS = {
+    '🎯': '\033[94m',  # Blue
+    '🧠': '\033[95m',  # Magenta
+    '🔧': '\033[96m',  # Cyan
+    '📋': '\033[37m',  # White
+    '✅': '\033[92m',  # Bright Green
+    '❌': '\033[91m',  # Bright Red
+    '⚠️': '\033[93m',  # Bright Yellow
+    '📤': '\033[94m',  # Blue
+    '📥': '\033[94m',  # Blue
+    '🤖': '\033[95m',  # Magenta
+}
+
+# One pass over the message for all prefixes instead of one replace per prefix
+PREFIX_RE = re.compile("|".join(map(re.escape, PREFIX_COLORS)))
+
+
 class ColoredFormatter(logging.Formatter):
     """Custom formatter with colors for different log levels."""
     
@@ -20,33 +39,34 @@ class ColoredFormatter(logging.Formatter):
         'RESET': '\033[0m'      # Reset
     }
     
-    def format(self, record):
-        # Add color to the log level
-        if record.levelname in self.COLORS:
-            record.levelname = f"{self.COLORS[record.levelname]}{record.levelname}{self.COLORS['RESET']}"
+    def __init__(self, *args, use_color: Optional[bool] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Escape codes only make sense on a terminal, not in a piped or redirected log
+        self._use_color = sys.stdout.isatty() if use_color is None else use_color
+        self._colored_levels = {
+            level: f"{color}{level}{self.COLORS['RESET']}"
+            for level, color in self.COLORS.items() if level != 'RESET'
+        }
         
-        # Format the message
-        formatted = super().format(record)
+    def format(self, record):
+        if not self._use_color:
+            return super().format(record)
+            
+        # Add color to the log level, restoring it so other handlers see the plain name
+        levelname = record.levelname
+        record.levelname = self._colored_levels.get(levelname, levelname)
+        try:
+            formatted = super().format(record)
+        finally:
+            record.levelname = levelname
         
         # Add color to specific prefixes
-        prefixes = {
-            '🎯': '\033[94m',  # Blue
-            '🧠': '\033[95m',  # Magenta
-            '🔧': '\033[96m',  # Cyan
-            '📋': '\033[37m',  # White
-            '✅': '\033[92m',  # Bright Green
-            '❌': '\033[91m',  # Bright Red
-            '⚠️': '\033[93m',  # Bright Yellow
-            '📤': '\033[94m',  # Blue
-            '📥': '\033[94m',  # Blue
-            '🤖': '\033[95m',  # Magenta
-        }
-        
-        for prefix, color in prefixes.items():
-            if prefix in formatted:
-                formatted = formatted.replace(prefix, f"{color}{prefix}{self.COLORS['RESET']}")
+        return PREFIX_RE.sub(self._color_prefix, formatted)
         
-        return formatted
+    def _color_prefix(self, match: re.Match) -> str:
+        """Wrap one matched emoji prefix in its color."""
+        prefix = match.group()
+        return f"{PREFIX_COLORS[prefix]}{prefix}{self.COLORS['RESET']}"
 
 
 def setup_enhanced_logging(level: str = "INFO") -> None:
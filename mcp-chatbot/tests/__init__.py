@@ -1,3 +1,11 @@
 """
 Test suite for AWS MCP Agent
 """
+
+import os
+import sys
+
+# Make src importable once for every test module (pytest and run_tests.py both import through this package)
+_SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+if _SRC not in sys.path:
+    sys.path.insert(0, _SRC)
@@ -0,0 +1,8 @@
+"""
+Test modules loaded by run_tests.py (keep in sync when adding test files)
+"""
+
+MODULES = [
+    'tests.test_core',
+    'tests.test_integration',
+]
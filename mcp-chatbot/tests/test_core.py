@@ -2,16 +2,13 @@
 Unit tests for core components
 """
 
+import copy
 import unittest
-import sys
 import os
-from unittest.mock import Mock, patch, MagicMock
-
-# Add src to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 
 from config.app_config import AppConfig
-from config.mcp_config import MCPConfig
+from config.mcp_config import MCPConfig, MCPServerConfig
 from core.isolated_mcp_client import IsolatedMCPClient
 from core.agent import SimpleAgent
 
@@ -55,15 +52,32 @@ class TestMCPConfig(unittest.TestCase):
         # Check for expected servers
         expected_servers = ['aws-api', 'aws-docs']
         for server in expected_servers:
-            self.assertIn(server, config.servers)
+            with self.subTest(server=server):
+                self.assertIn(server, config.servers)
+
+    def test_mcp_client_config_cache(self):
+        """Test client config is cached and rebuilt when servers change."""
+        config = MCPConfig.from_env()
+        client_config = config.to_mcp_client_config()
+        self.assertIs(config.to_mcp_client_config(), client_config)
+
+        config.add_server(MCPServerConfig(name="test-server", command="python"))
+        self.assertIn("test-server", config.to_mcp_client_config()["mcpServers"])
+
+        config.remove_server("test-server")
+        self.assertNotIn("test-server", config.to_mcp_client_config()["mcpServers"])
 
 
 class TestIsolatedMCPClient(unittest.TestCase):
     """Test IsolatedMCPClient functionality."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Parse the config once; no test here changes it."""
+        cls.config = MCPConfig.from_env()
+        
     def setUp(self):
         """Set up test fixtures."""
-        self.config = MCPConfig.from_env()
         self.client = IsolatedMCPClient(self.config)
     
     def test_client_creation(self):
@@ -83,14 +97,113 @@ class TestIsolatedMCPClient(unittest.TestCase):
         status = self.client.get_server_status()
         self.assertIsInstance(status, dict)
 
+    def test_tool_groups_cache(self):
+        """Test tool grouping and the tool list are cached until the tools change."""
+        from core.isolated_mcp_client import MCPTool
+        self.client.tools["aws-api:call_aws"] = MCPTool("call_aws", "", {}, "aws-api")
+        self.client._tools_version += 1
+        groups = self.client.tool_groups
+        self.assertIs(self.client.tool_groups, groups)
+        self.assertEqual(self.client.tool_counts, {"aws-api": 1})
+
+        tools = self.client.get_available_tools()
+        self.assertIs(self.client.get_available_tools(), tools)
+
+        self.client.tools["aws-docs:search"] = MCPTool("search", "", {}, "aws-docs")
+        self.client._tools_version += 1
+        self.assertEqual(self.client.tool_counts, {"aws-api": 1, "aws-docs": 1})
+        self.assertEqual(len(self.client.get_available_tools()), 2)
+
+    def test_servers_initialize_concurrently(self):
+        """Test servers start together and one failure does not stop the others."""
+        import asyncio
+        import time
+        started = []
+
+        async def init_server(name, server):
+            started.append(name)
+            await asyncio.sleep(0.2)
+            if name == "aws-docs":
+                raise RuntimeError("boom")
+
+        servers = {"aws-api": Mock(command="uvx"), "aws-docs": Mock(command="uvx")}
+        with patch.object(MCPConfig, "get_enabled_servers", return_value=servers), \
+                patch.object(self.client, "_async_initialize_server", side_effect=init_server):
+            start = time.monotonic()
+            asyncio.run(self.client._async_initialize())
+        self.assertEqual(sorted(started), ["aws-api", "aws-docs"])
+        self.assertLess(time.monotonic() - start, 0.35)
+
+    def test_concurrent_tool_calls_dispatch_by_id(self):
+        """Test overlapping tool calls on one server each get their own response."""
+        import asyncio
+        import json
+        from core.isolated_mcp_client import MCPTool
+
+        async def scenario():
+            stdout = asyncio.StreamReader()
+            process = Mock(stdout=stdout)
+            written = []
+            process.stdin.write.side_effect = lambda data: written.append(json.loads(data))
+            process.stdin.drain = AsyncMock()
+            pending = {}
+            self.client.tools["aws-api:call_aws"] = MCPTool("call_aws", "", {}, "aws-api")
+            self.client._server_data["aws-api"] = {
+                "process": process, "initialized": True, "lock": asyncio.Lock(), "pending": pending,
+                "ids": iter(range(3, 100)),
+                "reader": asyncio.create_task(self.client._reader_loop("aws-api", process, pending)),
+            }
+            calls = asyncio.gather(
+                self.client._async_call_tool("aws-api:call_aws", {"cli_command": "aws s3 ls"}),
+                self.client._async_call_tool("aws-api:call_aws", {"cli_command": "aws ec2 describe-vpcs"}),
+            )
+            while len(written) < 2:
+                await asyncio.sleep(0)
+            # Answer out of order, with a log notification in between
+            for request in reversed(written):
+                stdout.feed_data(json.dumps({"jsonrpc": "2.0", "method": "notifications/message",
+                                             "params": {"level": "info", "data": "working"}}).encode() + b"\n")
+                stdout.feed_data(json.dumps({"jsonrpc": "2.0", "id": request["id"],
+                                             "result": request["params"]["arguments"]}).encode() + b"\n")
+            results = await calls
+            stdout.feed_eof()
+            return results
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first["result"]["cli_command"], "aws s3 ls")
+        self.assertEqual(second["result"]["cli_command"], "aws ec2 describe-vpcs")
+
+    def test_aws_home_env_cached(self):
+        """Test ~/.aws is parsed once until the credentials file changes."""
+        import tempfile
+        from core import isolated_mcp_client
+        with tempfile.TemporaryDirectory() as tmp:
+            credentials = os.path.join(tmp, "credentials")
+            with open(credentials, "w") as f:
+                f.write("[default]\naws_access_key_id = AKIAONE\n")
+            with patch("os.path.expanduser", return_value=tmp):
+                self.assertEqual(isolated_mcp_client._aws_home_env()["AWS_ACCESS_KEY_ID"], "AKIAONE")
+                with patch("configparser.ConfigParser") as parser:
+                    isolated_mcp_client._aws_home_env()
+                    parser.assert_not_called()
+                with open(credentials, "w") as f:
+                    f.write("[default]\naws_access_key_id = AKIATWO2\n")
+                self.assertEqual(isolated_mcp_client._aws_home_env()["AWS_ACCESS_KEY_ID"], "AKIATWO2")
+
 
 class TestSimpleAgent(unittest.TestCase):
     """Test SimpleAgent functionality."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Parse the configs once for the whole class."""
+        cls.base_app_config = AppConfig.from_env()
+        cls.mcp_config = MCPConfig.from_env()
+        
     def setUp(self):
         """Set up test fixtures."""
-        self.app_config = AppConfig.from_env()
-        self.mcp_config = MCPConfig.from_env()
+        # Tests tweak app settings, so each gets its own shallow copy
+        self.app_config = copy.copy(self.base_app_config)
         self.mcp_client = IsolatedMCPClient(self.mcp_config)
         
         # Mock AWS session
@@ -132,6 +245,216 @@ class TestSimpleAgent(unittest.TestCase):
         except Exception as e:
             self.fail(f"Agent initialization failed: {e}")
 
+    def test_bedrock_client_shared(self):
+        """Test agents on the same session and region share one Bedrock client."""
+        import asyncio
+        other = SimpleAgent(self.app_config, Mock(), self.mock_session)
+        asyncio.run(self.agent.initialize())
+        asyncio.run(other.initialize())
+        self.assertIs(self.agent.bedrock_client, other.bedrock_client)
+        self.mock_session.client.assert_called_once()
+
+    def test_bedrock_client_released_with_session(self):
+        """Test a shared Bedrock client goes away once its session is dropped."""
+        import gc
+        import weakref
+        from core import agent as agent_module
+        
+        class Session:
+            def client(self, *args, **kwargs):
+                return object()
+                
+        session = Session()
+        client = agent_module._get_bedrock_client(session, "us-east-1")
+        self.assertIs(agent_module._get_bedrock_client(session, "us-east-1"), client)
+        self.assertIsNot(agent_module._get_bedrock_client(session, "eu-west-1"), client)
+        
+        dropped = weakref.ref(session)
+        del session
+        gc.collect()
+        # A strong reference in the client cache would keep the session alive
+        self.assertIsNone(dropped())
+
+    def test_process_message_stream(self):
+        """Test streamed responses are yielded chunk by chunk and recorded in history."""
+        import json
+        from core.async_handler import streamlit_async_handler
+
+        def delta(text):
+            payload = {"type": "content_block_delta", "delta": {"type": "text_delta", "text": text}}
+            return {"chunk": {"bytes": json.dumps(payload).encode()}}
+
+        self.agent._initialized = True
+        self.agent.bedrock_client = Mock()
+        self.agent._analyze_intent = AsyncMock(return_value={"needs_tools": False})
+        self.agent.bedrock_client.invoke_model_with_response_stream.return_value = {
+            "body": [{"chunk": {"bytes": b'{"type": "message_start"}'}}, delta("Bon"), delta("jour")]
+        }
+
+        chunks = list(streamlit_async_handler.iter_async(
+            self.agent.process_message_stream("hello")
+        ))
+        self.assertEqual(chunks, ["Bon", "jour"])
+        self.assertEqual(self.agent.conversation_history[-1]["assistant"], "Bonjour")
+
+    def test_history_window(self):
+        """Test history keeps the last memory_k exchanges and replays them to Bedrock."""
+        self.agent.app_config.memory_k = 2
+        for i in range(3):
+            self.agent._remember(f"q{i}", f"a{i}", [])
+        self.assertEqual([h["user"] for h in self.agent.conversation_history], ["q1", "q2"])
+
+        messages = self.agent._request_body("q3", 100, self.agent._format_recent_history())["messages"]
+        self.assertEqual([m["content"] for m in messages], ["q1", "a1", "q2", "a2", "q3"])
+        self.assertEqual(messages[-2]["role"], "assistant")
+
+    def test_history_summary(self):
+        """Test exchanges over the history budget are summarized into one synthetic turn."""
+        import asyncio
+        self.agent.app_config.memory_k = 5
+        self.agent.app_config.history_char_budget = 10
+        self.agent.app_config.summarize_history = True
+        self.agent._call_bedrock = AsyncMock(return_value="- VPC vpc-1 in ca-central-1")
+        asyncio.run(self.agent._summarize_evicted(self.agent._remember("q0", "a0", [])))
+        evicted = self.agent._remember("question1", "answer1", [])
+        self.assertEqual([h["user"] for h in evicted], ["q0"])
+        asyncio.run(self.agent._summarize_evicted(evicted))
+        self.assertEqual(self.agent._call_bedrock.await_count, 1)
+
+        messages = self.agent._format_recent_history()
+        self.assertIn("vpc-1", messages[0]["content"])
+        self.assertEqual([m["content"] for m in messages[2:]], ["question1", "answer1"])
+        self.agent.clear_history()
+        self.assertEqual(self.agent._format_recent_history(), [])
+
+    def test_request_body_system_prompt(self):
+        """Test static instructions go to the system field, cacheable when enabled."""
+        system_prompt, prompt = self.agent._build_response_prompt("list buckets", [])
+        self.assertNotIn("list buckets", system_prompt)
+        self.assertIn("list buckets", prompt)
+
+        self.agent.app_config.prompt_caching = False
+        self.assertEqual(self.agent._request_body(prompt, 100, system=system_prompt)["system"], system_prompt)
+        self.agent.app_config.prompt_caching = True
+        block = self.agent._request_body(prompt, 100, system=system_prompt)["system"][0]
+        self.assertEqual(block["cache_control"], {"type": "ephemeral"})
+
+    def test_intent_prompt_cache(self):
+        """Test the intent system blocks are rebuilt only when the tools change."""
+        from core.isolated_mcp_client import MCPTool
+        blocks = self.agent._intent_system_blocks()
+        self.assertIn('"needs_tools": true/false', blocks[0])
+        self.assertIs(self.agent._intent_system_blocks(), blocks)
+
+        self.mcp_client.tools["aws-api:call_aws"] = MCPTool("call_aws", "Run a CLI command", {}, "aws-api")
+        self.mcp_client._tools_version += 1
+        rules, tools = self.agent._intent_system_blocks()
+        self.assertIn("aws-api:call_aws: Run a CLI command", tools)
+        self.assertNotIn("call_aws: Run a CLI command", rules)
+        self.agent.app_config.prompt_caching = True
+        system = self.agent._request_body("q", 100, system=(rules, tools))["system"]
+        self.assertEqual([block["text"] for block in system], [rules, tools])
+        self.assertTrue(all("cache_control" in block for block in system))
+
+    def test_analyze_intent_extracts_json(self):
+        """Test the intent JSON is found inside surrounding prose."""
+        import asyncio
+        self.agent._call_bedrock = AsyncMock(
+            return_value='Here you go:\n{"needs_tools": true, "tool_calls": [{"name": "x", "arguments": {}}]}\nDone.'
+        )
+        intent = asyncio.run(self.agent._analyze_intent("list buckets"))
+        self.assertTrue(intent["needs_tools"])
+
+        self.agent._call_bedrock = AsyncMock(return_value="no json here")
+        self.assertFalse(asyncio.run(self.agent._analyze_intent("list buckets"))["needs_tools"])
+
+    def test_fast_intent(self):
+        """Test obvious read-only requests skip the Bedrock intent call."""
+        from core.isolated_mcp_client import MCPTool
+        self.mcp_client.tools["aws-api:call_aws"] = MCPTool("call_aws", "", {}, "aws-api")
+
+        def command(message):
+            intent = self.agent._fast_intent(message)
+            return intent and intent["tool_calls"][0]["arguments"]["cli_command"]
+
+        self.assertEqual(command("List my S3 buckets"), "aws s3 ls")
+        self.assertEqual(command("Liste mes buckets S3 ?"), "aws s3 ls")
+        self.assertEqual(
+            command("describe instances in ca-central-1"),
+            "aws ec2 describe-instances --region ca-central-1"
+        )
+        self.assertIsNone(command("Delete the VPC I created yesterday"))
+        self.assertIsNone(command("List my S3 buckets and delete the empty ones"))
+
+    def test_validate_tool_arguments(self):
+        """Test argument aliases are fixed and unknown parameters dropped."""
+        from core.isolated_mcp_client import MCPTool
+        schema = {"properties": {"cli_command": {}, "max_results": {}}, "required": ["cli_command"]}
+        self.mcp_client.tools["aws-api:call_aws"] = MCPTool("call_aws", "", schema, "aws-api")
+        fixed = self.agent._validate_and_fix_tool_arguments(
+            "aws-api:call_aws", {"command": "aws s3 ls", "verbose": True}
+        )
+        self.assertEqual(fixed, {"cli_command": "aws s3 ls"})
+
+        arguments = {"cli_command": "aws s3 ls"}
+        self.assertIs(self.agent._validate_and_fix_tool_arguments("aws-api:call_aws", arguments), arguments)
+
+    def test_response_prompt_tool_results(self):
+        """Test tool results are compact, deduplicated and truncated in the prompt."""
+        self.agent.app_config.max_tool_result_chars = 20
+        result = {"tool": "aws-api:call_aws", "result": {"result": "x" * 50}}
+        _, prompt = self.agent._build_response_prompt("list buckets", [result, dict(result)])
+        self.assertEqual(prompt.count("aws-api:call_aws"), 1)
+        self.assertIn('{"result":"xxxxxxxxx... [truncated 43 chars]', prompt)
+
+    def test_error_message_dispatch(self):
+        """Test errors map to messages by AWS error code or exception type."""
+        from botocore.exceptions import ClientError, NoCredentialsError
+        throttled = ClientError({"Error": {"Code": "ThrottlingException"}}, "InvokeModel")
+        self.assertIn("trop de requêtes", self.agent._error_message(throttled))
+        self.assertIn("identifiants AWS", self.agent._error_message(NoCredentialsError()))
+        self.assertIn("boucles", self.agent._error_message(RuntimeError("Event loop is closed")))
+        self.assertTrue(self.agent._error_message(ValueError("ThrottlingException")).endswith(": ThrottlingException"))
+
+    def test_execute_tools_concurrently(self):
+        """Test tool calls overlap and keep their requested order."""
+        import asyncio
+        import time
+
+        def call_tool(name, arguments):
+            time.sleep(0.2)
+            if name == "broken":
+                raise RuntimeError("boom")
+            return {"result": name}
+
+        self.agent.mcp_client = Mock(tools={})
+        self.agent.mcp_client.call_tool.side_effect = call_tool
+        intent = {"needs_tools": True, "tool_calls": [{"name": n} for n in ("a", "broken", "c")]}
+
+        start = time.monotonic()
+        results = asyncio.run(self.agent._execute_tools("hello", intent))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual([r["tool"] for r in results], ["a", "broken", "c"])
+        self.assertEqual(results[1]["result"], {"error": "boom"})
+
+
+class TestAdmissionGate(unittest.TestCase):
+    """Test AdmissionGate functionality."""
+
+    def test_slot_limits_in_flight(self):
+        """Test slots are capped and released."""
+        from core.async_handler import AdmissionGate
+        gate = AdmissionGate(1)
+        with gate.slot():
+            self.assertEqual(gate.in_flight, 1)
+            with self.assertRaises(TimeoutError):
+                with gate.slot(timeout=0):
+                    pass
+            gate.resize(2)
+            with gate.slot(timeout=0):
+                self.assertEqual(gate.in_flight, 2)
+        self.assertEqual(gate.in_flight, 0)
+
 
 if __name__ == '__main__':
     unittest.main()
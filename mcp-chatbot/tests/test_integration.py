@@ -3,13 +3,9 @@ Integration tests for AWS MCP Agent
 """
 
 import unittest
-import sys
 import os
 from unittest.mock import Mock, patch
 
-# Add src to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
-
 from app import SimpleMCPApp
 from auth.aws_sso_auth import AWSSSOAuthenticator
 
@@ -29,27 +25,16 @@ class TestSSOIntegration(unittest.TestCase):
     
     def test_sso_profile_validation(self):
         """Test SSO profile validation."""
-        # Test valid configuration
-        valid_errors = self.sso_auth.validate_sso_configuration(
-            'https://d-1234567890.awsapps.com/start',
-            'ca-central-1',
-            '123456789012',
-            'AWSAdministratorAccess'
-        )
-        self.assertEqual(len(valid_errors), 0)
-        
-        # Test invalid configuration
-        invalid_errors = self.sso_auth.validate_sso_configuration(
-            'invalid-url',
-            'invalid-region',
-            '123',
-            ''
-        )
-        self.assertGreater(len(invalid_errors), 0)
-        self.assertIn('sso_start_url', invalid_errors)
-        self.assertIn('sso_region', invalid_errors)
-        self.assertIn('sso_account_id', invalid_errors)
-        self.assertIn('sso_role_name', invalid_errors)
+        cases = [
+            (('https://d-1234567890.awsapps.com/start', 'ca-central-1', '123456789012', 'AWSAdministratorAccess'),
+             set()),
+            (('invalid-url', 'invalid-region', '123', ''),
+             {'sso_start_url', 'sso_region', 'sso_account_id', 'sso_role_name'}),
+        ]
+        for args, expected in cases:
+            with self.subTest(args=args):
+                errors = self.sso_auth.validate_sso_configuration(*args)
+                self.assertEqual(set(errors), expected)
     
     def test_get_available_profiles(self):
         """Test getting available SSO profiles."""
@@ -57,22 +42,122 @@ class TestSSOIntegration(unittest.TestCase):
         self.assertIsInstance(profiles, dict)
         # Note: This may be empty in test environment, which is fine
 
+    def test_profiles_cache_refreshes_on_change(self):
+        """Test parsed profiles are reused until the config file changes."""
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            self.sso_auth.config_file = os.path.join(tmp, "config")
+            with open(self.sso_auth.config_file, "w") as f:
+                f.write("[profile one]\nsso_start_url = https://d-1.awsapps.com/start\n")
+            self.assertEqual(list(self.sso_auth.get_available_sso_profiles()), ["one"])
+            
+            with patch.object(self.sso_auth, "_read_sso_profiles") as read:
+                self.sso_auth.get_available_sso_profiles()
+                read.assert_not_called()
+                
+            with open(self.sso_auth.config_file, "a") as f:
+                f.write("[profile two]\nsso_start_url = https://d-2.awsapps.com/start\n")
+            self.assertEqual(sorted(self.sso_auth.get_available_sso_profiles()), ["one", "two"])
+
+    def test_read_sso_profiles(self):
+        """Test the fast profile parser picks SSO sections and their keys."""
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            self.sso_auth.config_file = os.path.join(tmp, "config")
+            with open(self.sso_auth.config_file, "w") as f:
+                f.write(
+                    "[default]\nregion = us-east-1\n\n"
+                    "[profile dev]\nsso_start_url = https://d-1.awsapps.com/start\n"
+                    "# comment\nsso_account_id=123456789012\nSSO_Role_Name = Admin\nregion = eu-west-1\n"
+                )
+            profiles = self.sso_auth._read_sso_profiles()
+            self.assertEqual(list(profiles), ["dev"])
+            self.assertEqual(profiles["dev"]["sso_account_id"], "123456789012")
+            self.assertEqual(profiles["dev"]["sso_role_name"], "Admin")
+            self.assertEqual(profiles["dev"]["region"], "eu-west-1")
+
+    def test_configure_new_profile_appends(self):
+        """Test adding a profile appends its section and keeps existing comments."""
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            self.sso_auth.aws_home = tmp
+            self.sso_auth.config_file = os.path.join(tmp, "config")
+            original = "# my settings\n[default]\nregion = us-east-1\n"
+            with open(self.sso_auth.config_file, "w") as f:
+                f.write(original)
+            self.assertTrue(self.sso_auth.configure_new_sso_profile(
+                "dev", "https://d-1.awsapps.com/start", "us-east-1", "123456789012", "Admin", "eu-west-1"
+            ))
+            with open(self.sso_auth.config_file) as f:
+                self.assertTrue(f.read().startswith(original + "\n[profile dev]\n"))
+            self.assertEqual(self.sso_auth.get_available_sso_profiles()["dev"]["sso_role_name"], "Admin")
+            
+            self.assertTrue(self.sso_auth.configure_new_sso_profile(
+                "dev", "https://d-1.awsapps.com/start", "us-east-1", "123456789012", "ReadOnly", "eu-west-1"
+            ))
+            self.assertEqual(self.sso_auth.get_available_sso_profiles()["dev"]["sso_role_name"], "ReadOnly")
+
+    def test_device_login_writes_token_cache(self):
+        """Test the in-process SSO login writes the CLI token cache entry."""
+        import hashlib
+        import json
+        import tempfile
+        import threading
+        profile = {"sso_start_url": "https://d-1.awsapps.com/start", "sso_region": "us-east-1", "sso_session": ""}
+        oidc = Mock()
+        oidc.register_client.return_value = {"clientId": "id", "clientSecret": "secret"}
+        oidc.start_device_authorization.return_value = {
+            "deviceCode": "dc", "userCode": "ABCD-EFGH", "interval": 0, "expiresIn": 60,
+            "verificationUri": "https://device.sso.us-east-1.amazonaws.com/",
+            "verificationUriComplete": "https://device.sso.us-east-1.amazonaws.com/?user_code=ABCD-EFGH",
+        }
+        oidc.create_token.return_value = {"accessToken": "token", "expiresIn": 3600}
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(self.sso_auth, "get_available_sso_profiles", return_value={"dev": profile}), \
+                patch("boto3.client", return_value=oidc):
+            self.sso_auth.aws_home = tmp
+            self.sso_auth.clear_pending_login("dev")
+            pending = self.sso_auth.start_device_login("dev")
+            self.assertEqual(pending["user_code"], "ABCD-EFGH")
+            for thread in threading.enumerate():
+                if thread.name == "sso-login-dev":
+                    thread.join(timeout=5)
+            self.assertEqual(self.sso_auth.get_pending_login("dev")["status"], "success")
+
+            cache_name = hashlib.sha1(profile["sso_start_url"].encode()).hexdigest() + ".json"
+            with open(os.path.join(tmp, "sso", "cache", cache_name)) as f:
+                entry = json.load(f)
+            self.assertEqual(entry["accessToken"], "token")
+            self.assertEqual(entry["startUrl"], profile["sso_start_url"])
+            self.assertTrue(entry["expiresAt"].endswith("Z"))
+            self.assertTrue(self.sso_auth.has_valid_sso_token(profile))
+            
+            entry["expiresAt"] = "2020-01-01T00:00:00UTC"
+            with open(os.path.join(tmp, "sso", "cache", cache_name), "w") as f:
+                json.dump(entry, f)
+            self.assertFalse(self.sso_auth.has_valid_sso_token(profile))
+            self.sso_auth.clear_pending_login("dev")
+
 
 class TestAppIntegration(unittest.TestCase):
     """Test main application integration."""
     
-    @patch('streamlit.session_state', new_callable=dict)
-    def test_app_creation(self, mock_session_state):
-        """Test main app can be created."""
+    @classmethod
+    def setUpClass(cls):
+        """Build the app once; the tests below only read its attributes."""
         # Mock session state
-        mock_session_state.update({
-            'messages': [],
-            'debug_info': [],
-            'show_debug': False,
-            'authenticated': False
-        })
-        
-        app = SimpleMCPApp()
+        with patch('streamlit.session_state', new_callable=dict) as mock_session_state:
+            mock_session_state.update({
+                'messages': [],
+                'debug_info': [],
+                'show_debug': False,
+                'authenticated': False
+            })
+            cls.app = SimpleMCPApp()
+    
+    def test_app_creation(self):
+        """Test main app can be created."""
+        app = self.app
         self.assertIsInstance(app, SimpleMCPApp)
         self.assertTrue(hasattr(app, 'app_config'))
         self.assertTrue(hasattr(app, 'mcp_config'))
@@ -80,7 +165,7 @@ class TestAppIntegration(unittest.TestCase):
     
     def test_app_components(self):
         """Test app components are properly initialized."""
-        app = SimpleMCPApp()
+        app = self.app
         
         # Test config objects
         self.assertIsNotNone(app.app_config)
@@ -90,6 +175,25 @@ class TestAppIntegration(unittest.TestCase):
         # Test SSO authenticator
         self.assertIsInstance(app.sso_authenticator, AWSSSOAuthenticator)
 
+    def test_mcp_client_shut_down_by_last_user(self):
+        """Test the shared MCP client is cleaned up and evicted once its last session lets go."""
+        import app as app_module
+        key = ("test-profile", "eu-west-3")
+        with patch("core.isolated_mcp_client.IsolatedMCPClient", side_effect=lambda config: Mock()), \
+                patch.object(app_module, "_session_id", side_effect=["a", "b", "a", "b", "c", "c"]):
+            client = app_module._acquire_mcp_client(*key)
+            self.assertIs(app_module._acquire_mcp_client(*key), client)
+
+            app_module._release_mcp_client(key)
+            client.cleanup.assert_not_called()
+            app_module._release_mcp_client(key)
+            client.cleanup.assert_called_once()
+
+            replacement = app_module._acquire_mcp_client(*key)
+            self.assertIsNot(replacement, client)
+            app_module._release_mcp_client(key)
+            replacement.cleanup.assert_called_once()
+
 
 class TestEndToEndFlow(unittest.TestCase):
     """Test end-to-end application flow."""
@@ -1,45 +1,112 @@
+import asyncio
+import functools
 import os
-import boto3
+import re
 
-from langchain.chains import ConversationChain
-from langchain.llms.bedrock import Bedrock
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
+# boto3, LangChain, the custom tools, the output parser and the semantic cache (numpy)
+# are imported inside the functions that need them, so importing this module stays cheap.
 
-from langchain.agents import AgentType, ZeroShotAgent, Tool, AgentExecutor, initialize_agent, load_tools
-
-# Import Search Tool
-from langchain.utilities import SerpAPIWrapper
-
-# Import Custom Tools
-from agents.tools import tool_search_ec2_instances_by_tag, tool_start_ec2_instance, tool_stop_ec2_instance, tool_search_all_ec2_instances, tool_get_ec2_instance_launcher, tool_get_ec2_instance_stopper, tool_list_s3_buckets
-
-# Import configuration
+# Import configuration (values are passed to clients explicitly; os.environ is left untouched)
 try:
-    from config import set_environment, AWS_PROFILE, AWS_DEFAULT_REGION, BEDROCK_MODEL_ID, TEMPERATURE, TOP_P, MAX_TOKENS
-    set_environment()
+    from config import AWS_PROFILE, AWS_DEFAULT_REGION, BEDROCK_MODEL_ID, TEMPERATURE, TOP_P, MAX_TOKENS
 except ImportError:
     print("⚠️  Configuration file not found. Please copy config.py.template to config.py and update with your values.")
     print("Using default values for now...")
-    AWS_PROFILE = "default"
-    AWS_DEFAULT_REGION = "us-east-1"
+    AWS_PROFILE = os.environ.get("AWS_PROFILE", "default")
+    AWS_DEFAULT_REGION = os.environ.get("AWS_DEFAULT_REGION", "us-east-1")
     BEDROCK_MODEL_ID = "anthropic.claude-v2"
     TEMPERATURE = 0.0
     TOP_P = 0.5
     MAX_TOKENS = 2000
-    os.environ["AWS_PROFILE"] = AWS_PROFILE
-    os.environ["AWS_DEFAULT_REGION"] = AWS_DEFAULT_REGION
 
-def bedrock_chain():
-    profile = os.environ.get("AWS_PROFILE", "default")
+try:
+    from config import SERPAPI_API_KEY
+except ImportError:
+    SERPAPI_API_KEY = os.environ.get("SERPAPI_API_KEY")
+
+# Placeholder values from the config templates mean no key was configured
+if SERPAPI_API_KEY in ("your-serpapi-key-here", "your_serpapi_key_here"):
+    SERPAPI_API_KEY = None
+
+# Semantic cache settings are optional so older config.py files keep working
+try:
+    from config import SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES
+except ImportError:
+    SEMANTIC_CACHE_ENABLED = False
+    SEMANTIC_CACHE_THRESHOLD = 0.87
+    SEMANTIC_CACHE_MAX_ENTRIES = 1000
+
+try:
+    from config import SEMANTIC_CACHE_TTL
+except ImportError:
+    SEMANTIC_CACHE_TTL = 300
+
+_semantic_cache = None
+
+# Tools that change AWS state; once one runs, every cached answer may describe stale state
+_MUTATING_TOOLS = frozenset({"start_ec2_instance", "stop_ec2_instance"})
+
+# Prompts naming a specific resource (instance/volume/... ids, account ids, regions, ARNs,
+# tags or quoted values) embed almost like those naming another one, so they skip the cache
+_AWS_IDENTIFIER_RE = re.compile(
+    r"\b[a-z]+-[0-9a-f]{8,17}\b|\b\d{12}\b|\b[a-z]{2}(?:-gov)?-[a-z]+-\d\b|\barn:|\btags?\b|[\"'`]",
+    re.IGNORECASE
+)
+
+def get_semantic_cache():
+    """Return the shared semantic cache, or None when it is disabled"""
+    global _semantic_cache, SEMANTIC_CACHE_ENABLED
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    if _semantic_cache is None:
+        try:
+            from cache import SemanticCache
+            _semantic_cache = SemanticCache(
+                threshold=SEMANTIC_CACHE_THRESHOLD,
+                max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+                ttl=SEMANTIC_CACHE_TTL
+            )
+        except ImportError as e:
+            _disable_semantic_cache(e)
+            return None
+    return _semantic_cache
+
+def _disable_semantic_cache(reason):
+    """Turn the semantic cache off for the rest of the process; answers keep coming from the chain"""
+    global _semantic_cache, SEMANTIC_CACHE_ENABLED
+    print(f"⚠️  Semantic cache disabled: {reason}")
+    SEMANTIC_CACHE_ENABLED = False
+    _semantic_cache = None
+
+def _new_memory():
+    from langchain.memory import ConversationBufferWindowMemory
+
+    # Window memory actually honors k, so only the last 5 exchanges are sent back to Claude
+    return ConversationBufferWindowMemory(
+        memory_key='chat_history',
+        output_key='output',
+        k=5,
+        return_messages=True)
+
+@functools.lru_cache(maxsize=4)
+def _build_agent(profile, model_id, region):
+    """Build the LLM, tools and prompt once per (profile, model, region); sessions share them"""
+    import boto3
+    from langchain.agents import StructuredChatAgent, Tool
+    from langchain.llms.bedrock import Bedrock
+    from langchain.prompts import MessagesPlaceholder
+    from langchain.utilities import SerpAPIWrapper
+
+    from agents.parser import BatchStructuredChatOutputParser, BATCH_FORMAT_INSTRUCTIONS, BATCH_SUFFIX
+    from agents.tools import tool_search_ec2_instances_by_tag, tool_start_ec2_instance, tool_stop_ec2_instance, tool_search_all_ec2_instances, tool_get_ec2_instance_launcher, tool_get_ec2_instance_stopper, tool_list_s3_buckets
 
     bedrock_runtime = boto3.client(
         service_name="bedrock-runtime",
-        region_name=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
+        region_name=region,
     )
     
     llm = Bedrock(
-        model_id=BEDROCK_MODEL_ID, 
+        model_id=model_id, 
         client=bedrock_runtime, 
         credentials_profile_name=profile
     )
@@ -49,52 +116,97 @@ def bedrock_chain():
         "max_tokens_to_sample": MAX_TOKENS
     }
 
-    # Initialize tools list
-    tools = []
+    # AWS tools, listed once each: every tool description is rendered into the prompt
+    tools = [
+        tool_search_ec2_instances_by_tag,
+        tool_search_all_ec2_instances,
+        tool_start_ec2_instance,
+        tool_stop_ec2_instance,
+        tool_get_ec2_instance_launcher,
+        tool_get_ec2_instance_stopper,
+        tool_list_s3_buckets
+    ]
     
     # Add web search tool if SerpAPI key is available
-    if os.environ.get("SERPAPI_API_KEY") and os.environ.get("SERPAPI_API_KEY") != "your-serpapi-key-here":
-        search = SerpAPIWrapper()
-        tools.append(Tool(
+    if SERPAPI_API_KEY:
+        search = SerpAPIWrapper(serpapi_api_key=SERPAPI_API_KEY)
+        tools.insert(0, Tool(
             name="Search",
             func=search.run,
             description="useful for when you need to answer questions about current events. "
                         "You should ask targeted questions"
         ))
 
-    # Add AWS tools
-    tools.extend([
-        tool_search_ec2_instances_by_tag(),
-        tool_search_all_ec2_instances(),
-        tool_start_ec2_instance(),
-        tool_stop_ec2_instance(),
-        tool_get_ec2_instance_launcher(),
-        tool_get_ec2_instance_stopper(),
-        tool_list_s3_buckets()
-    ])
-    
-    memory = ConversationBufferMemory(
-        memory_key='chat_history',
-        k=5,
-        return_messages=True)
+    assert len(dict.fromkeys(t.name for t in tools)) == len(tools), "Duplicate tool names in agent tools"
     
-    react_agent = initialize_agent(
-        tools, 
-        llm, 
-        agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
-        memory=memory,
+    # Same agent initialize_agent builds for STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION.
+    # Tools and instructions form one static system block; history and input follow it
+    react_agent = StructuredChatAgent.from_llm_and_tools(
+        llm,
+        tools,
+        output_parser=BatchStructuredChatOutputParser(),
+        format_instructions=BATCH_FORMAT_INSTRUCTIONS,
+        suffix=BATCH_SUFFIX,
+        memory_prompts=[MessagesPlaceholder(variable_name="chat_history")],
+        input_variables=["input", "agent_scratchpad", "chat_history"],
+    )
+
+    return react_agent, tuple(tools)
+
+def bedrock_chain():
+    from langchain.agents import AgentExecutor
+
+    agent, tools = _build_agent(AWS_PROFILE, BEDROCK_MODEL_ID, AWS_DEFAULT_REGION)
+    # A fresh executor per session: it is cheap and owns the session's memory and callbacks
+    return AgentExecutor.from_agent_and_tools(
+        agent=agent,
+        tools=list(tools),
+        memory=_new_memory(),
         verbose=True,
         max_iteration=2,
-        return_intermediate_steps=False,
+        # run_chain reads the steps to keep state-changing answers out of the semantic cache
+        return_intermediate_steps=True,
         handle_parsing_errors=True
     )
 
-    return react_agent
+def _invoke_chain(chain, prompt):
+    # The async executor path gathers the tool calls of a batched step concurrently
+    return asyncio.run(chain.acall({"input": prompt}))
 
 def run_chain(chain, prompt):
-    # num_tokens = chain.llm.get_num_tokens(prompt)
-    num_tokens = 2
-    return chain({"input": prompt}), num_tokens
+    cache = get_semantic_cache()
+    embedding = None
+    # The cache is shared by every session and keyed on the prompt alone, so only a
+    # conversation's opening question (no history to depend on) that names no resource may use it
+    if cache is not None and not chain.memory.chat_memory.messages and not _AWS_IDENTIFIER_RE.search(prompt):
+        try:
+            embedding = cache.encode(prompt)
+            cached = cache.get(embedding)
+        except Exception as e:  # e.g. the embedding model cannot be downloaded or loaded
+            _disable_semantic_cache(e)
+            cache = embedding = None
+        else:
+            if cached is not None:
+                # Record the exchange so follow-up questions see it, as a real run would
+                chain.memory.save_context({"input": prompt}, {"output": cached})
+                return {"input": prompt, "output": cached}
+
+    response = _invoke_chain(chain, prompt)
+    if cache is not None:
+        steps = response.get("intermediate_steps", ())
+        try:
+            if any(action.tool in _MUTATING_TOOLS for action, _ in steps):
+                cache.clear()
+            elif embedding is not None:
+                # Only the answer text is shared; the response also holds this session's input and history
+                cache.put(embedding, response["output"])
+        except Exception as e:
+            _disable_semantic_cache(e)
+    return response
+
+async def run_chain_async(chain, prompt):
+    # Bedrock and the AWS tools use sync boto3, so run the chain off the event loop
+    return await asyncio.to_thread(run_chain, chain, prompt)
 
 def clear_memory(chain):
     return chain.memory.clear()
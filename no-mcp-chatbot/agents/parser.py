@@ -0,0 +1,82 @@
+import json
+from typing import List, Union
+
+from langchain.agents.structured_chat.output_parser import StructuredChatOutputParser
+from langchain.schema import AgentAction, AgentFinish, OutputParserException
+
+BATCH_FORMAT_INSTRUCTIONS = """Use a json blob to specify a tool by providing an action key (tool name) and an action_input key (tool input).
+
+Valid "action" values: "Final Answer" or {tool_names}
+
+Provide one action per $JSON_BLOB, as shown:
+
+```
+{{{{
+  "action": $TOOL_NAME,
+  "action_input": $INPUT
+}}}}
+```
+
+When several tool calls do not depend on each other's results (for example stopping several instances), you may provide them together as a json list of blobs, and they will run at the same time:
+
+```
+[
+  {{{{"action": $TOOL_NAME, "action_input": $INPUT}}}},
+  {{{{"action": $TOOL_NAME, "action_input": $INPUT}}}}
+]
+```
+
+Follow this format:
+
+Question: input question to answer
+Thought: consider previous and subsequent steps
+Action:
+```
+$JSON_BLOB
+```
+Observation: action result
+... (repeat Thought/Action/Observation N times)
+Thought: I know what to respond
+Action:
+```
+{{{{
+  "action": "Final Answer",
+  "action_input": "Final response to human"
+}}}}
+```"""
+
+
+BATCH_SUFFIX = """Begin! Reminder to ALWAYS respond with a valid json blob of an action, or a json list of independent actions. Use tools if necessary. Respond directly if appropriate. Format is Action:```$JSON_BLOB```then Observation:.
+Thought:"""
+
+
+class BatchStructuredChatOutputParser(StructuredChatOutputParser):
+    """Structured chat parser that keeps every action of a json list instead of the first one"""
+
+    def parse(self, text: str) -> Union[AgentAction, List[AgentAction], AgentFinish]:
+        try:
+            action_match = self.pattern.search(text)
+            if action_match is None:
+                return AgentFinish({"output": text}, text)
+
+            response = json.loads(action_match.group(1).strip(), strict=False)
+            if not isinstance(response, list):
+                response = [response]
+
+            tool_calls = [r for r in response if r["action"] != "Final Answer"]
+            if not tool_calls:
+                return AgentFinish({"output": response[0]["action_input"]}, text)
+            if len(tool_calls) == 1:
+                return AgentAction(tool_calls[0]["action"], tool_calls[0].get("action_input", {}), text)
+
+            # Only the first action carries the log so the scratchpad does not repeat the LLM output
+            return [
+                AgentAction(r["action"], r.get("action_input", {}), text if i == 0 else "")
+                for i, r in enumerate(tool_calls)
+            ]
+        except Exception as e:
+            raise OutputParserException(f"Could not parse LLM output: {text}") from e
+
+    @property
+    def _type(self) -> str:
+        return "batch_structured_chat"
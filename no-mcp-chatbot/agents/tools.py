@@ -1,54 +1,87 @@
-from typing import Type
+import asyncio
+import threading
+from typing import Callable, Optional, Type
 from pydantic import BaseModel, Field
 from langchain.tools import BaseTool
 
 from functions.ec2 import search_ec2_instances_by_tag, start_ec2_instance, search_all_ec2_instances, stop_ec2_instance, get_ec2_instance_stopper, get_ec2_instance_launcher
 from functions.s3 import list_s3_buckets
 
+# Caps how many AWS calls batched tool actions run at once, sync or async. A threading
+# semaphore because each Streamlit session drives its chain on its own event loop
+_tool_slots = threading.BoundedSemaphore(10)
+
+async def _run_with_slot(func, *args):
+    # Poll instead of blocking a worker thread on acquire, so cancellation never strands a slot
+    while not _tool_slots.acquire(blocking=False):
+        await asyncio.sleep(0.05)
+    try:
+        return await func(*args)
+    finally:
+        _tool_slots.release()
+
+async def _run_in_thread(func, *args):
+    def call():
+        with _tool_slots:
+            return func(*args)
+    return await asyncio.to_thread(call)
+
+class _DynamicTool(BaseTool):
+    """Tool that forwards its inputs positionally to a plain (sync or async) function"""
+
+    func: Callable
+
+    @property
+    def args(self) -> dict:
+        # Without a schema BaseTool would infer "args"/"kwargs" from _run and advertise them in the prompt
+        if self.args_schema is None:
+            return {}
+        return super().args
+
+    def _run(self, *args, **kwargs):
+        call_args = (*args, *kwargs.values())
+        if asyncio.iscoroutinefunction(self.func):
+            return asyncio.run(self.func(*call_args))
+        return self.func(*call_args)
+
+    async def _arun(self, *args, **kwargs):
+        call_args = (*args, *kwargs.values())
+        if asyncio.iscoroutinefunction(self.func):
+            return await _run_with_slot(self.func, *call_args)
+        return await _run_in_thread(self.func, *call_args)
+
+def make_tool(name: str, description: str, fn: Callable, schema: Optional[Type[BaseModel]] = None) -> BaseTool:
+    """Wrap `fn` as a LangChain tool taking the fields of `schema` as arguments"""
+    return _DynamicTool(name=name, description=description, args_schema=schema, func=fn)
+
+################################################################
+
 class input_search_ec2_instances_by_tag(BaseModel):
     """Inputs for search_ec2_instances_by_tag function"""
 
     attribute: str = Field(description="A tag key to search for")
 
-class tool_search_ec2_instances_by_tag(BaseTool):
-    name = "search_ec2_instances_by_tag"
-    description = """
+tool_search_ec2_instances_by_tag = make_tool(
+    "search_ec2_instances_by_tag",
+    """
         Useful when you want to lists EC2 Instances by tag key.
         You should enter the tag key you want to search for.
-        """
-    args_schema: Type[BaseModel] = input_search_ec2_instances_by_tag
-
-    def _run(self, attribute: str):
-        response = search_ec2_instances_by_tag(attribute)
-        return response
+        """,
+    search_ec2_instances_by_tag,
+    input_search_ec2_instances_by_tag,
+)
 
-    def _arun(self, attribute: str):
-        raise NotImplementedError(
-            "search_ec2_instances_by_tag does not support async calls")
-    
 ################################################################
 
-# class input_search_all_ec2_instances(BaseModel):
-#     """Inputs for search_all_ec2_instances function"""
-#     attribute: str = None
-
-
-class tool_search_all_ec2_instances(BaseTool):
-    name = "search_all_ec2_instances"
-    description = """
+tool_search_all_ec2_instances = make_tool(
+    "search_all_ec2_instances",
+    """
         Useful when you want to lists all EC2 Instances.
         No input needed.
-        """
-    args_schema: Type[BaseModel] = None
+        """,
+    search_all_ec2_instances,
+)
 
-    def _run(self):
-        response = search_all_ec2_instances()
-        return response
-
-    def _arun(self):
-        raise NotImplementedError(
-            "search_all_ec2_instances does not support async calls")
-    
 ################################################################
 
 class input_start_ec2_instance(BaseModel):
@@ -56,23 +89,17 @@ class input_start_ec2_instance(BaseModel):
 
     attribute: str = Field(description="The instance id to start")
 
-class tool_start_ec2_instance(BaseTool):
-    name = "start_ec2_instance"
-    description = """
+tool_start_ec2_instance = make_tool(
+    "start_ec2_instance",
+    """
         Useful when you want to start an EC2 Instance.
         You should enter the instance id you want to start.
         Returns a map of instance id with the current state.
-        """
-    args_schema: Type[BaseModel] = input_start_ec2_instance
-
-    def _run(self, attribute: str):
-        response = start_ec2_instance(attribute)
-        return response
+        """,
+    start_ec2_instance,
+    input_start_ec2_instance,
+)
 
-    def _arun(self, attribute: str):
-        raise NotImplementedError(
-            "start_ec2_instance not support async calls")
-    
 ################################################################
 
 class input_stop_ec2_instance(BaseModel):
@@ -80,45 +107,28 @@ class input_stop_ec2_instance(BaseModel):
 
     attribute: str = Field(description="The instance id to stop")
 
-class tool_stop_ec2_instance(BaseTool):
-    name = "stop_ec2_instance"
-    description = """
+tool_stop_ec2_instance = make_tool(
+    "stop_ec2_instance",
+    """
         Useful when you want to stop an EC2 Instance.
         You should enter the instance id you want to stop.
         Returns a map of instance id with the current state.
-        """
-    args_schema: Type[BaseModel] = input_stop_ec2_instance
-
-    def _run(self, attribute: str):
-        response = stop_ec2_instance(attribute)
-        return response
-
-    def _arun(self, attribute: str):
-        raise NotImplementedError(
-            "stop_ec2_instance not support async calls")
+        """,
+    stop_ec2_instance,
+    input_stop_ec2_instance,
+)
 
 ################################################################
 
-# class input_list_s3_buckets(BaseModel):
-#     """Inputs for list_s3_buckets function"""
-#     attribute: str = None
-
-class tool_list_s3_buckets(BaseTool):
-    name = "list_s3_buckets"
-    description = """
+tool_list_s3_buckets = make_tool(
+    "list_s3_buckets",
+    """
         Useful when you want to lists all S3 Buckets.
         No input needed.
-        """
-    args_schema: Type[BaseModel] = None
-
-    def _run(self):
-        response = list_s3_buckets()
-        return response
+        """,
+    list_s3_buckets,
+)
 
-    def _arun(self):
-        raise NotImplementedError(
-            "list_s3_buckets does not support async calls")
-    
 ################################################################
 
 class input_get_ec2_instance_launcher(BaseModel):
@@ -126,23 +136,17 @@ class input_get_ec2_instance_launcher(BaseModel):
 
     attribute: str = Field(description="The instance id to check for")
 
-class tool_get_ec2_instance_launcher(BaseTool):
-    name = "get_ec2_instance_launcher"
-    description = """
+tool_get_ec2_instance_launcher = make_tool(
+    "get_ec2_instance_launcher",
+    """
         Useful when you want to check who launched an EC2 Instance.
         You should enter the instance id to check for.
         Returns a map of instance id with the username who launched the instance and the time of the event.
-        """
-    args_schema: Type[BaseModel] = input_get_ec2_instance_launcher
+        """,
+    get_ec2_instance_launcher,
+    input_get_ec2_instance_launcher,
+)
 
-    def _run(self, attribute: str):
-        response = get_ec2_instance_launcher(attribute)
-        return response
-
-    def _arun(self, attribute: str):
-        raise NotImplementedError(
-            "get_ec2_instance_launcher not support async calls")
-    
 ################################################################
 
 class input_get_ec2_instance_stopper(BaseModel):
@@ -150,19 +154,13 @@ class input_get_ec2_instance_stopper(BaseModel):
 
     attribute: str = Field(description="The instance id to check for")
 
-class tool_get_ec2_instance_stopper(BaseTool):
-    name = "get_ec2_instance_stopper"
-    description = """
+tool_get_ec2_instance_stopper = make_tool(
+    "get_ec2_instance_stopper",
+    """
         Useful when you want to check who stopped an EC2 Instance.
         You should enter the instance id to check for.
         Returns a map of instance id with the username who stopped the instance and the time of the event.
-        """
-    args_schema: Type[BaseModel] = input_get_ec2_instance_stopper
-
-    def _run(self, attribute: str):
-        response = get_ec2_instance_stopper(attribute)
-        return response
-
-    def _arun(self, attribute: str):
-        raise NotImplementedError(
-            "get_ec2_instance_stopper not support async calls")
\ No newline at end of file
+        """,
+    get_ec2_instance_stopper,
+    input_get_ec2_instance_stopper,
+)
@@ -12,6 +12,12 @@ else:
     st.session_state["user_id"] = user_id
 
 if "llm_chain" not in st.session_state:
+    # The EC2/S3 tools use the default boto3 credential chain, so export the profile once per session
+    try:
+        from config import set_environment
+        set_environment()
+    except ImportError:
+        pass
     st.session_state["llm_app"] = bedrock
     st.session_state["llm_chain"] = bedrock.bedrock_chain()
 
@@ -50,11 +56,10 @@ def handle_input():
 
     llm_chain = st.session_state["llm_chain"]
     chain = st.session_state["llm_app"]
-    result, amount_of_tokens = chain.run_chain(llm_chain, input)
+    result = chain.run_chain(llm_chain, input)
     question_with_id = {
         "question": input,
         "id": len(st.session_state.questions),
-        "tokens": amount_of_tokens,
     }
     st.session_state.questions.append(question_with_id)
 
@@ -71,7 +76,6 @@ def write_user_message(md):
         st.image(USER_ICON, use_column_width="always")
     with col2:
         st.warning(md["question"])
-        st.write(f"Tokens used: {md['tokens']}")
 
 
 def render_answer(answer):
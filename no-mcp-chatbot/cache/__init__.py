@@ -0,0 +1 @@
+from .semantic import SemanticCache
@@ -0,0 +1,84 @@
+"""Random-projection LSH index for approximate cosine-similarity lookups"""
+# Python Built-Ins:
+from typing import Dict, List, Optional
+
+# External Dependencies:
+import numpy as np
+
+
+class RandomProjectionLSH:
+    """Bucket unit vectors by the signs of random projections
+
+    Each of the `n_tables` hash tables projects a vector onto `n_bits` random
+    gaussian directions and packs the resulting sign bits into a single uint16
+    bucket key. Vectors with a high cosine similarity agree on most signs, so a
+    query only needs exact scoring against the entries sharing one of its buckets.
+
+    Parameters
+    ----------
+    n_tables :
+        Number of independent hash tables. More tables raise recall.
+    n_bits :
+        Sign bits per table (at most 16). More bits make buckets smaller.
+    dim :
+        Dimension of the indexed vectors.
+    seed :
+        Optional seed for the random projections.
+    """
+
+    def __init__(self, n_tables: int = 8, n_bits: int = 16, dim: int = 384, seed: Optional[int] = None):
+        if not 0 < n_bits <= 16:
+            raise ValueError("n_bits must be between 1 and 16 to fit a uint16 bucket key")
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.dim = dim
+        rng = np.random.default_rng(seed)
+        self._projections = rng.standard_normal((n_tables * n_bits, dim)).astype(np.float32)
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(n_tables)]
+        self._keys: Dict[int, np.ndarray] = {}
+
+    def hash(self, vector: np.ndarray) -> np.ndarray:
+        """Return one uint16 bucket key per table for `vector`"""
+        signs = (self._projections @ vector).reshape(self.n_tables, self.n_bits) > 0
+        packed = np.packbits(signs, axis=1)
+        if packed.shape[1] == 1:
+            packed = np.hstack([packed, np.zeros_like(packed)])
+        return packed.view(">u2").ravel()
+
+    def add(self, entry_id: int, vector: np.ndarray):
+        """Index `vector` under `entry_id`"""
+        keys = self.hash(vector)
+        for table, key in zip(self._tables, keys.tolist()):
+            table.setdefault(key, []).append(entry_id)
+        self._keys[entry_id] = keys
+
+    def remove(self, entry_id: int):
+        """Drop `entry_id` from every bucket it was added to"""
+        keys = self._keys.pop(entry_id, None)
+        if keys is None:
+            return
+        for table, key in zip(self._tables, keys.tolist()):
+            bucket = table.get(key)
+            if bucket is None:
+                continue
+            bucket.remove(entry_id)
+            if not bucket:
+                del table[key]
+
+    def query(self, vector: np.ndarray) -> np.ndarray:
+        """Return the ids of all entries sharing at least one bucket with `vector`"""
+        candidates = set()
+        for table, key in zip(self._tables, self.hash(vector).tolist()):
+            bucket = table.get(key)
+            if bucket:
+                candidates.update(bucket)
+        return np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+
+    def clear(self):
+        """Remove every indexed entry"""
+        for table in self._tables:
+            table.clear()
+        self._keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._keys)
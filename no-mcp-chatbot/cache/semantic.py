@@ -0,0 +1,177 @@
+"""Semantic response cache for the Bedrock agent chain"""
+# Python Built-Ins:
+import importlib.util
+import threading
+import time
+from typing import Any, Optional, Sequence
+
+# External Dependencies:
+import numpy as np
+
+from .lsh import RandomProjectionLSH
+
+
+class SemanticCache:
+    """Return stored chain responses for prompts similar to one already answered
+
+    Prompts are embedded with a sentence-transformers model and L2-normalized. A
+    random-projection LSH index narrows each lookup to the cached prompts sharing a
+    bucket with the query, and only those candidates are scored by exact cosine
+    similarity. When the cache is full the least recently used entry is overwritten,
+    and entries older than `ttl` seconds are never returned.
+
+    Parameters
+    ----------
+    model_name :
+        Name of the sentence-transformers model used to embed prompts.
+    threshold :
+        Minimum cosine similarity for a cached response to be returned.
+    max_entries :
+        Maximum number of cached responses before LRU eviction kicks in.
+    ttl :
+        Seconds a cached response stays valid, or None to keep it until evicted.
+    n_tables :
+        Number of LSH hash tables. The defaults keep recall around 85% for pairs
+        right at the 0.87 threshold and above 99% for near-duplicate prompts.
+    n_bits :
+        Sign bits per LSH hash table (at most 16).
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        threshold: float = 0.87,
+        max_entries: int = 1000,
+        ttl: Optional[float] = 300.0,
+        n_tables: int = 16,
+        n_bits: int = 12,
+    ):
+        # sentence-transformers pulls in torch, so only check it is installed until the model is needed
+        if importlib.util.find_spec("sentence_transformers") is None:
+            raise ImportError(
+                "sentence-transformers is required for the semantic cache. "
+                "Install it with: pip install sentence-transformers"
+            )
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self._model = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _get_model(self):
+        """Load the embedding model on first use"""
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode(self, prompt: str) -> np.ndarray:
+        """Embed a prompt as an L2-normalized float32 vector"""
+        embedding = self._get_model().encode(prompt, convert_to_numpy=True)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        if norm > 0:
+            embedding /= norm
+        return embedding
+
+    def encode_batch(self, prompts: Sequence[str], batch_size: int = 64) -> np.ndarray:
+        """Embed many prompts in one batched forward pass as L2-normalized float32 rows"""
+        embeddings = self._get_model().encode(
+            list(prompts),
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def warm(self, prompts: Sequence[str], responses: Sequence[Any], batch_size: int = 64):
+        """Pre-populate the cache with known prompt/response pairs
+
+        The prompts are embedded as a single batch, which is far cheaper than
+        encoding them one call at a time.
+        """
+        if len(prompts) != len(responses):
+            raise ValueError("prompts and responses must have the same length")
+        if not prompts:
+            return
+        for embedding, response in zip(self.encode_batch(prompts, batch_size=batch_size), responses):
+            self.put(embedding, response)
+
+    def get(self, embedding: np.ndarray) -> Optional[Any]:
+        """Return the cached response closest to `embedding`, or None on a miss"""
+        with self._lock:
+            if self._size == 0:
+                return None
+            candidates = self._index.query(embedding)
+            if candidates.size == 0:
+                return None
+            sims = self._embeddings[candidates] @ embedding
+            if self.ttl is not None:
+                # Expired entries stay in place until overwritten; they just never match
+                expired = self._stored_at[candidates] < time.monotonic() - self.ttl
+                sims[expired] = -np.inf
+            best_pos = int(np.argmax(sims))
+            if sims[best_pos] < self.threshold:
+                return None
+            best = int(candidates[best_pos])
+            self._tick += 1
+            self._last_used[best] = self._tick
+            return self._responses[best]
+
+    def put(self, embedding: np.ndarray, response: Any):
+        """Store a response under `embedding`, evicting the LRU entry when full"""
+        with self._lock:
+            self._tick += 1
+            if self._index is None:
+                self._index = RandomProjectionLSH(
+                    n_tables=self.n_tables, n_bits=self.n_bits, dim=embedding.shape[0]
+                )
+            if self._size < self.max_entries:
+                if self._size == len(self._embeddings):
+                    self._grow(embedding.shape[0])
+                slot = self._size
+                self._size += 1
+                self._responses.append(response)
+            else:
+                slot = int(np.argmin(self._last_used[:self._size]))
+                self._responses[slot] = response
+                self._index.remove(slot)
+            self._embeddings[slot] = embedding
+            self._last_used[slot] = self._tick
+            self._stored_at[slot] = time.monotonic()
+            self._index.add(slot, embedding)
+
+    def _grow(self, dim: int):
+        """Double the embedding buffer so appends stay amortized O(d)"""
+        capacity = min(max(2 * len(self._embeddings), 16), self.max_entries)
+        embeddings = np.zeros((capacity, dim), dtype=np.float32)
+        last_used = np.zeros(capacity, dtype=np.int64)
+        stored_at = np.zeros(capacity, dtype=np.float64)
+        if self._size:
+            embeddings[:self._size] = self._embeddings[:self._size]
+            last_used[:self._size] = self._last_used[:self._size]
+            stored_at[:self._size] = self._stored_at[:self._size]
+        self._embeddings = embeddings
+        self._last_used = last_used
+        self._stored_at = stored_at
+
+    def _reset(self):
+        self._embeddings = np.zeros((0, 0), dtype=np.float32)
+        self._last_used = np.zeros(0, dtype=np.int64)
+        self._stored_at = np.zeros(0, dtype=np.float64)
+        self._responses = []
+        self._index = None
+        self._size = 0
+        self._tick = 0
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._reset()
+
+    def __len__(self) -> int:
+        return self._size
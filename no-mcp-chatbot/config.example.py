@@ -20,6 +20,12 @@ TEMPERATURE = 0.0  # Controls randomness (0.0 = deterministic, 1.0 = very random
 TOP_P = 0.5  # Controls diversity (0.1 = focused, 1.0 = diverse)
 MAX_TOKENS = 2000  # Maximum tokens in response
 
+# Semantic Cache (requires sentence-transformers)
+SEMANTIC_CACHE_ENABLED = False  # Reuse answers for similar prompts instead of calling Bedrock (answers can be up to TTL seconds stale)
+SEMANTIC_CACHE_THRESHOLD = 0.87  # Minimum cosine similarity (0.0-1.0) for a cache hit
+SEMANTIC_CACHE_MAX_ENTRIES = 1000  # Least recently used answers are evicted past this size
+SEMANTIC_CACHE_TTL = 300  # Seconds before a cached answer expires
+
 def set_environment():
     """Set environment variables from configuration"""
     os.environ["AWS_PROFILE"] = AWS_PROFILE
@@ -1,75 +1,66 @@
 import boto3
+import functools
+import itertools
 import json
-
-client = boto3.client('ec2', region_name="us-east-1")
+from botocore.exceptions import BotoCoreError, ClientError
+
+@functools.lru_cache(maxsize=None)
+def _client(service, region="us-east-1"):
+    """Build each boto3 client once per (service, region); building one parses the service model"""
+    return boto3.client(service, region_name=region)
+
+def _error(e):
+    """Describe an AWS failure, or a response missing an expected field, as a dict the agent can read back"""
+    if isinstance(e, ClientError):
+        return {'error': e.response.get('Error', {}).get('Code', 'Unknown'), 'message': str(e)}
+    return {'error': type(e).__name__, 'message': str(e)}
+
+def _instances(response):
+    """Flatten describe_instances reservations into instance summaries, or None if there are none"""
+    reservations = response.get('Reservations')
+    if not reservations:
+        return None
+    return [
+        {
+            'Instance ID': instance['InstanceId'],
+            'State': instance.get('State', {}).get('Name', 'N/A'),
+            'Private IP': instance.get('PrivateIpAddress', 'N/A'),
+            'Public IP': instance.get('PublicIpAddress', 'N/A'),
+        }
+        for instance in itertools.chain.from_iterable(r.get('Instances', ()) for r in reservations)
+    ]
 
 def search_ec2_instances_by_tag(tag_key: str):
     """Function to return the list of EC2 instances for a given tag"""
     try:
+        # Accepts "tag:Name", "tag=Name" or a bare "Name"
         if 'tag:' in tag_key:
-            response = client.describe_instances(Filters=[{'Name': f'{tag_key}', 'Values': ['*']}])
+            filter_name = tag_key
         elif 'tag=' in tag_key:
-            response = client.describe_instances(Filters=[{'Name': f"tag:{tag_key.split('=')[1]}", 'Values': ['*']}])
+            filter_name = f"tag:{tag_key.split('=')[1]}"
         else:
-            response = client.describe_instances(Filters=[{'Name': f'tag:{tag_key}', 'Values': ['*']}])
+            filter_name = f'tag:{tag_key}'
+        response = _client('ec2').describe_instances(Filters=[{'Name': filter_name, 'Values': ['*']}])
 
-        instances = []
-        if response['Reservations'] == []:
-            # print(f"no instances found with tag {tag_key}") 
-            return None
-        else:
-            for reservation in response['Reservations']:
-                for instance in reservation['Instances']:
-                    instance_id = instance['InstanceId']
-                    instance_state = instance['State']['Name']
-                    private_ip = instance.get('PrivateIpAddress', 'N/A')
-                    public_ip = instance.get('PublicIpAddress', 'N/A')
-
-                    instances.append({
-                        'Instance ID': instance_id,
-                        'State': instance_state,
-                        'Private IP': private_ip,
-                        'Public IP': public_ip,
-                    })
-            # print(f"found instances with tag {tag_key}: {instances}") 
-            return instances
-
-    except Exception as e:
-        return str(e)
+        return _instances(response)
+
+    except (BotoCoreError, ClientError, KeyError, IndexError) as e:
+        return _error(e)
 
 def search_all_ec2_instances():
     """Function to return the list of all EC2 instances"""
     try:    
-        response = client.describe_instances()
+        response = _client('ec2').describe_instances()
 
-        instances = []
-        if response['Reservations'] == []:
-            # print(f"no instances found") 
-            return None
-        else:
-            for reservation in response['Reservations']:
-                for instance in reservation['Instances']:
-                    instance_id = instance['InstanceId']
-                    instance_state = instance['State']['Name']
-                    private_ip = instance.get('PrivateIpAddress', 'N/A')
-                    public_ip = instance.get('PublicIpAddress', 'N/A')
-
-                    instances.append({
-                        'Instance ID': instance_id,
-                        'State': instance_state,
-                        'Private IP': private_ip,
-                        'Public IP': public_ip,
-                    })
-            # print(f"found instances : {instances}") 
-            return instances
-
-    except Exception as e:
-        return str(e)
+        return _instances(response)
+
+    except (BotoCoreError, ClientError, KeyError, IndexError) as e:
+        return _error(e)
     
 def start_ec2_instance(instance_id):
     """Function to start an instance given instance id"""
     try:
-        ec2 = boto3.client('ec2', region_name="us-east-1")
+        ec2 = _client('ec2')
 
         response = ec2.start_instances(InstanceIds=[instance_id])
 
@@ -81,13 +72,13 @@ def start_ec2_instance(instance_id):
         # print(f"started EC2 instance with ID: {instance_id}")
         return result
 
-    except Exception as e:
-        return str(e)
+    except (BotoCoreError, ClientError, KeyError, IndexError) as e:
+        return _error(e)
     
 def stop_ec2_instance(instance_id):
     """Function to stop an instance given an instance id"""
     try:
-        ec2 = boto3.client('ec2', region_name="us-east-1")
+        ec2 = _client('ec2')
 
         response = ec2.stop_instances(InstanceIds=[instance_id])
 
@@ -99,93 +90,48 @@ def stop_ec2_instance(instance_id):
         # print(f"stopped  EC2 instance with ID: {instance_id}")
         return result
 
-    except Exception as e:
-        return str(e)
+    except (BotoCoreError, ClientError, KeyError, IndexError) as e:
+        return _error(e)
     
+def _who_did(instance_id, event_name, label, not_found):
+    """Return who triggered the latest CloudTrail event_name on an instance"""
+    response = _client('cloudtrail').lookup_events(
+        LookupAttributes=[
+            {
+                'AttributeKey': 'ResourceName',
+                'AttributeValue': instance_id
+            },
+            {
+                'AttributeKey': 'EventName',
+                'AttributeValue': event_name
+            }
+        ]
+    )
+    for event in response.get('Events', ()):
+        if any(resource.get('ResourceName') == instance_id for resource in event.get('Resources', ())):
+            return {
+                'InstanceId': instance_id,
+                label: event.get('Username', 'Unknown'),
+                'Event_Time': event.get('EventTime', 'N/A')
+            }
+
+    return {
+        'InstanceId': instance_id,
+        label: not_found
+    }
+
 def get_ec2_instance_launcher(instance_id):
     """Function to check who launched an EC2 instance """
     try:
-        cloudtrail = boto3.client('cloudtrail', region_name="us-east-1")
-
-        response = cloudtrail.lookup_events(
-            LookupAttributes=[
-                {
-                    'AttributeKey': 'ResourceName',
-                    'AttributeValue': instance_id
-                },
-                {
-                    'AttributeKey': 'EventName',
-                    'AttributeValue': 'StartInstances'
-                }
-            ]
-        )
-        for event in response['Events']:
-            username = None
-            for resource in event['Resources']:
-                if resource['ResourceName'] == instance_id:
-                    username = event['Username']
-
-            if username:
-                result = {
-                    'InstanceId': instance_id,
-                    'Launched_By': username,
-                    'Event_Time': event['EventTime']
-                } 
-                break
-
-        # If 'username' is still None, no relevant events were found.
-        if username is None:
-            result = {
-                    'InstanceId': instance_id,
-                    'Launched_By': "No launch events found for instance"
-                }
+        return _who_did(instance_id, 'StartInstances', 'Launched_By', "No launch events found for instance")
 
-        return result
-
-    except Exception as e:
-        return str(e)
+    except (BotoCoreError, ClientError, KeyError, IndexError) as e:
+        return _error(e)
     
 def get_ec2_instance_stopper(instance_id):
     """Function to check who stopped an EC2 instance """
     try:
-        cloudtrail = boto3.client('cloudtrail', region_name="us-east-1")
-
-        response = cloudtrail.lookup_events(
-            LookupAttributes=[
-                {
-                    'AttributeKey': 'ResourceName',
-                    'AttributeValue': instance_id
-                },
-                {
-                    'AttributeKey': 'EventName',
-                    'AttributeValue': 'StartInstances'
-                }
-            ]
-        )
-        for event in response['Events']:
-            username = None
-            for resource in event['Resources']:
-                if resource['ResourceName'] == instance_id:
-                    username = event['Username']
-
-            if username:
-                result = {
-                    'InstanceId': instance_id,
-                    'Stopped_By': username,
-                    'Event_Time': event['EventTime']
-                } 
-                break
-
-        # If 'username' is still None, no relevant events were found.
-        if username is None:
-            result = {
-                    'InstanceId': instance_id,
-                    'Stopped_By': "No stop events found for instance"
-                }
-
-        return result
-
-    except Exception as e:
-        return str(e)
-
+        return _who_did(instance_id, 'StopInstances', 'Stopped_By', "No stop events found for instance")
 
+    except (BotoCoreError, ClientError, KeyError, IndexError) as e:
+        return _error(e)
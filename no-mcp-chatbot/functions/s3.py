@@ -1,17 +1,16 @@
-import boto3
+import aioboto3
 import json
+import os
 
-client = boto3.client('s3', region_name="us-east-1")
+# Sessions are cheap and loop-agnostic; clients are opened per call so they never outlive their event loop
+session = aioboto3.Session()
 
-def list_s3_buckets() :
+async def list_s3_buckets() :
     """Function to list all S3 buckets"""
     try:
-        response = client.list_buckets()
-        buckets = []
-        for bucket in response['Buckets']:
-            buckets.append(bucket['Name'])
-
-        return response
+        async with session.client('s3', region_name=os.environ.get("AWS_DEFAULT_REGION", "us-east-1")) as client:
+            response = await client.list_buckets()
+        return [bucket['Name'] for bucket in response['Buckets']]
 
     except Exception as e:
-        return str(e)
\ No newline at end of file
+        return str(e)